@@ -0,0 +1,43 @@
+"""add_tenant_created_composite_indexes
+
+Revision ID: 5b7e2c9d4a13
+Revises: 0714992e241d
+Create Date: 2026-10-15 09:12:41.530217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2c9d4a13'
+down_revision: Union[str, Sequence[str], None] = '0714992e241d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Composite tenant indexes for filtered + sorted listing."""
+    
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_query_logs_tenant_created ON query_logs (tenant_id, created_at DESC)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tenant_created ON documents (tenant_id, created_at DESC)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tenant_category ON documents (tenant_id, category)")
+        
+        # The composites lead with tenant_id, so the single-column indexes are redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_query_logs_tenant_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tenant_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Restore single-column tenant indexes."""
+    
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tenant_id ON documents (tenant_id)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_query_logs_tenant_id ON query_logs (tenant_id)")
+        
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tenant_category")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tenant_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_query_logs_tenant_created")
@@ -0,0 +1,37 @@
+"""query_logs_bigint_identity_pk
+
+Revision ID: 8c1f4e6a2b90
+Revises: 5b7e2c9d4a13
+Create Date: 2026-10-15 10:03:18.664102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4e6a2b90'
+down_revision: Union[str, Sequence[str], None] = '5b7e2c9d4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Replace the text UUID key on query_logs with a BIGINT identity."""
+    
+    # Existing rows are numbered by Postgres when the identity column is added
+    op.drop_constraint('query_logs_pkey', 'query_logs', type_='primary')
+    op.drop_column('query_logs', 'id')
+    op.execute("ALTER TABLE query_logs ADD COLUMN id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Restore the text UUID key on query_logs."""
+    
+    op.drop_constraint('query_logs_pkey', 'query_logs', type_='primary')
+    op.drop_column('query_logs', 'id')
+    op.add_column('query_logs', sa.Column('id', sa.String(), nullable=False, server_default=sa.text("gen_random_uuid()::text")))
+    op.alter_column('query_logs', 'id', server_default=None)
+    op.create_primary_key('query_logs_pkey', 'query_logs', ['id'])
@@ -0,0 +1,47 @@
+"""webhooks_jsonb_events_indexes
+
+Revision ID: a7d2e5c8f140
+Revises: f3a8b1c6d925
+Create Date: 2026-10-15 19:42:31.206517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2e5c8f140'
+down_revision: Union[str, Sequence[str], None] = 'f3a8b1c6d925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - JSONB webhook events with a GIN index, plus an active-webhooks index."""
+    
+    # webhooks isn't created by an earlier revision; nothing to do where it doesn't exist yet
+    if not sa.inspect(op.get_bind()).has_table("webhooks"):
+        return
+    
+    # JSON has no containment operator; JSONB supports events @> '["event"]'
+    op.execute("ALTER TABLE webhooks ALTER COLUMN events TYPE JSONB USING events::jsonb")
+    
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_webhooks_events ON webhooks USING gin (events)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_webhooks_tenant_active ON webhooks (tenant_id) WHERE is_active")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop the webhook indexes and go back to JSON events."""
+    
+    if not sa.inspect(op.get_bind()).has_table("webhooks"):
+        return
+    
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_webhooks_tenant_active")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_webhooks_events")
+    
+    op.execute("ALTER TABLE webhooks ALTER COLUMN events TYPE JSON USING events::json")
@@ -0,0 +1,47 @@
+"""covering_query_logs_analytics_indexes
+
+Revision ID: c4d9a7e31f52
+Revises: 8c1f4e6a2b90
+Create Date: 2026-10-15 11:27:05.118934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9a7e31f52'
+down_revision: Union[str, Sequence[str], None] = '8c1f4e6a2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Covering indexes for the admin analytics scans."""
+    
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        # Build the covering replacement first so tenant filters always have an index
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_query_logs_tenant_created_covering "
+            "ON query_logs (tenant_id, created_at DESC) INCLUDE (success, response_time_ms)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_query_logs_tenant_created")
+        op.execute("ALTER INDEX ix_query_logs_tenant_created_covering RENAME TO ix_query_logs_tenant_created")
+        
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_query_logs_created_at ON query_logs (created_at)")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Back to the plain (tenant_id, created_at DESC) index."""
+    
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_query_logs_created_at")
+        
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_query_logs_tenant_created_plain "
+            "ON query_logs (tenant_id, created_at DESC)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_query_logs_tenant_created")
+        op.execute("ALTER INDEX ix_query_logs_tenant_created_plain RENAME TO ix_query_logs_tenant_created")
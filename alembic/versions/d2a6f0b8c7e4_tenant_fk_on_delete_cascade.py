@@ -0,0 +1,37 @@
+"""tenant_fk_on_delete_cascade
+
+Revision ID: d2a6f0b8c7e4
+Revises: c4d9a7e31f52
+Create Date: 2026-10-15 12:40:52.301776
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a6f0b8c7e4'
+down_revision: Union[str, Sequence[str], None] = 'c4d9a7e31f52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Let Postgres cascade tenant deletes to child rows."""
+    
+    op.drop_constraint('documents_tenant_id_fkey', 'documents', type_='foreignkey')
+    op.create_foreign_key('documents_tenant_id_fkey', 'documents', 'tenants', ['tenant_id'], ['id'], ondelete='CASCADE')
+    
+    op.drop_constraint('query_logs_tenant_id_fkey', 'query_logs', type_='foreignkey')
+    op.create_foreign_key('query_logs_tenant_id_fkey', 'query_logs', 'tenants', ['tenant_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema - Restore plain foreign keys."""
+    
+    op.drop_constraint('query_logs_tenant_id_fkey', 'query_logs', type_='foreignkey')
+    op.create_foreign_key('query_logs_tenant_id_fkey', 'query_logs', 'tenants', ['tenant_id'], ['id'])
+    
+    op.drop_constraint('documents_tenant_id_fkey', 'documents', type_='foreignkey')
+    op.create_foreign_key('documents_tenant_id_fkey', 'documents', 'tenants', ['tenant_id'], ['id'])
@@ -0,0 +1,44 @@
+"""add_query_log_documents_table
+
+Revision ID: e91b3c5d7f08
+Revises: d2a6f0b8c7e4
+Create Date: 2026-10-15 13:55:29.847310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b3c5d7f08'
+down_revision: Union[str, Sequence[str], None] = 'd2a6f0b8c7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Link table for document filters on query logs."""
+    op.create_table(
+        'query_log_documents',
+        sa.Column('query_log_id', sa.BigInteger(), nullable=False),
+        sa.Column('document_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['query_log_id'], ['query_logs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('query_log_id', 'document_id')
+    )
+    op.create_index('ix_query_log_documents_document_log', 'query_log_documents', ['document_id', 'query_log_id'])
+    
+    # Backfill from the JSON filters recorded so far
+    op.execute("""
+        INSERT INTO query_log_documents (query_log_id, document_id)
+        SELECT DISTINCT id, json_array_elements_text(filters_applied->'document_ids')
+        FROM query_logs
+        WHERE json_typeof(filters_applied->'document_ids') = 'array'
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop the link table."""
+    op.drop_index('ix_query_log_documents_document_log', table_name='query_log_documents')
+    op.drop_table('query_log_documents')
@@ -0,0 +1,36 @@
+"""documents_keyset_pagination_index
+
+Revision ID: f3a8b1c6d925
+Revises: e91b3c5d7f08
+Create Date: 2026-10-15 16:21:07.418392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8b1c6d925'
+down_revision: Union[str, Sequence[str], None] = 'e91b3c5d7f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - (tenant_id, created_at, id) index for keyset pagination of documents."""
+    
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tenant_created_id ON documents (tenant_id, created_at DESC, id DESC)")
+        
+        # Same leading columns, so the old index is redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tenant_created")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Restore the (tenant_id, created_at) index."""
+    
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tenant_created ON documents (tenant_id, created_at DESC)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tenant_created_id")
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,13 +19,40 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     TENANT_ID_FIELD: str = "tenant_id"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 10  # Cost factor for password hashing (passlib default is 12)
+    # Comma-separated tenant ids allowed to call collection-wide admin operations (empty = none)
+    ADMIN_TENANT_IDS: str = ""
 
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800  # seconds; recycle before managed Postgres drops idle connections
+    DB_POOL_PRE_PING: bool = False  # extra round trip per checkout, recycle covers stale connections
+    DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statement cache per connection
+    DB_QUERY_CACHE_SIZE: int = 2000  # SQLAlchemy compiled statement LRU (default 500)
+    DB_USE_PGBOUNCER: bool = False  # transaction pooling: no server-side prepared statements, no app pool
 
     # Qdrant
     QDRANT_URL: str
     QDRANT_API_KEY: str
     QDRANT_COLLECTION: str = "multi_tenant_rag"
+    QDRANT_PREFER_GRPC: bool = True  # one multiplexed HTTP/2 channel instead of REST + JSON
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 30
+
+    # Uploads
+    MAX_UPLOAD_MB: int = 50
+    # Processes parsing large PDFs, per app worker (each uvicorn worker has its own pool)
+    PDF_WORKERS: int = 2
+
+    # Diagnostics: expose /debug/* endpoints (unauthenticated; keep off in production)
+    DEBUG_ENDPOINTS: bool = False
+
+    # Caching
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300
+    # Per-process: invalidate_answers only clears the worker that changed the documents,
+    # so this TTL is how long other workers may serve answers built from stale documents
+    ASK_CACHE_TTL_SECONDS: int = 30
 
     # OpenAI
     OPENAI_API_KEY: str
@@ -32,8 +60,24 @@ class Settings(BaseSettings):
     
     # Embedding Model (NEW)
     EMBEDDING_MODEL: str = "local"
+    # Chunks per embedding call when indexing (HuggingFace defaults to 10)
+    EMBED_BATCH_SIZE: int = 64
+
+    # Reranker: "cuda"/"cpu", empty = use CUDA when available
+    RERANKER_DEVICE: str = ""
+    # Token cap per (query, chunk) pair; lower it to trade recall for speed
+    RERANKER_MAX_LENGTH: int = 512
+    # CPU only: int8 ONNX file in the model repo (e.g. "onnx/model_qint8_avx512_vnni.onnx"), empty = torch
+    RERANKER_ONNX_FILE: str = ""
+    # ONNX Runtime threads per inference; 1 lets concurrent requests use separate cores, 0 = ORT default
+    RERANKER_ONNX_THREADS: int = 0
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings once per process so the .env file is parsed a single time."""
+    return Settings()
 
-settings = Settings()
+settings = get_settings()
 
 os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
 if settings.GEMINI_API_KEY:
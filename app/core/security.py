@@ -1,12 +1,27 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials # <--- Added HTTPAuthorizationCredentials and HTTPBearer
-from jose import jwt, JWTError
+import jwt
+from jwt import InvalidTokenError
+from cachetools import TTLCache
+from functools import lru_cache
+import threading
+import time
 from app.core.config import settings
+from app.core.logging_config import logger
 
 # We use HTTPBearer for standard "Authorization: Bearer <token>" header handling.
 # This scheme expects the client to send: Authorization: Bearer <token>
 security = HTTPBearer()
 
+# Verified tokens -> (tenant_id, exp). Entries are also dropped once the token expires.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_token_cache_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def jwt_key() -> bytes:
+    """SECRET_KEY as HMAC key bytes, encoded once instead of on every sign/verify."""
+    return settings.SECRET_KEY.encode()
+
 def get_current_tenant_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """
     Decodes the JWT token, validates the signature, and extracts the tenant_id.
@@ -20,23 +35,47 @@ def get_current_tenant_id(credentials: HTTPAuthorizationCredentials = Depends(se
 
     token = credentials.credentials # Extract the actual token string
 
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None:
+        tenant_id, exp = cached
+        if exp is None or exp > time.time():
+            return tenant_id
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+
     try:
         # 1. Decode the token using the SECRET_KEY from settings
         payload = jwt.decode(
             token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
+            jwt_key(), 
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["exp"]}
         )
         
         # 2. Extract the tenant_id
         tenant_id: str = payload.get(settings.TENANT_ID_FIELD)
         
         if tenant_id is None:
-            print("❌ Token missing tenant_id")
+            logger.warning("Token missing tenant_id")
             raise credentials_exception
+
+        with _token_cache_lock:
+            _token_cache[token] = (tenant_id, payload.get("exp"))
             
         return tenant_id
 
-    except JWTError as e:
-        print(f"❌ JWT Error: {e}")
-        raise credentials_exception
\ No newline at end of file
+    except InvalidTokenError as e:
+        logger.warning("JWT rejected: %s", e)
+        raise credentials_exception
+
+
+def require_admin_tenant(tenant_id: str = Depends(get_current_tenant_id)) -> str:
+    """Dependency for collection-wide operations: the token's tenant must be listed in ADMIN_TENANT_IDS."""
+    admin_tenants = {t.strip() for t in settings.ADMIN_TENANT_IDS.split(",") if t.strip()}
+    if tenant_id not in admin_tenants:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return tenant_id
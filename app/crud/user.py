@@ -1,10 +1,22 @@
-from sqlalchemy.orm import selectinload
+import anyio.to_thread
+from functools import lru_cache
+from sqlalchemy.orm import joinedload, raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.models.document import User, Tenant
+from app.models.document import User, Tenant, generate_uuid
+from app.core.config import settings
+from app.database import transaction
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Existing hashes carry their own cost factor, so they keep verifying after a change;
+# any other cost is flagged by verify_and_update and rehashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -12,12 +24,20 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Verified against when the email is unknown so both login paths cost the same (built on first use, not at import)."""
+    return hash_password("dummy-password-for-timing")
+
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     result = await db.execute(
         select(User)
-        .options(selectinload(User.tenant))  # ← Add this line
+        .options(
+            joinedload(User.tenant),  # 1:1, one LEFT JOIN instead of a second SELECT
+            raiseload("*")  # Any other relationship access fails loudly instead of lazy loading
+        )
         .where(User.email == email)
     )
     return result.scalar_one_or_none()
@@ -28,19 +48,16 @@ async def create_user_with_tenant(db: AsyncSession, email: str, password: str, t
     Creates a new user and their tenant in a single transaction.
     Returns (user, tenant) tuple.
     """
-    # Create user
-    hashed_password = hash_password(password)
-    user = User(email=email, hashed_password=hashed_password)
-    db.add(user)
-    await db.flush()  # Get user.id without committing
-    
-    # Create tenant for the user
-    tenant = Tenant(name=tenant_name, owner_id=user.id)
-    db.add(tenant)
-    
-    await db.commit()
-    await db.refresh(user)
-    await db.refresh(tenant)
+    # Create user (hashing is CPU-bound, keep it off the event loop)
+    hashed_password = await anyio.to_thread.run_sync(hash_password, password)
+
+    # IDs are generated client-side so both rows go out in one flush,
+    # and expire_on_commit=False keeps the in-memory values valid without refreshes
+    user_id = generate_uuid()
+    user = User(id=user_id, email=email, hashed_password=hashed_password)
+    tenant = Tenant(id=generate_uuid(), name=tenant_name, owner_id=user_id)
+    async with transaction(db):
+        db.add_all([user, tenant])
     
     return user, tenant
 
@@ -52,9 +69,19 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> User
     """
     user = await get_user_by_email(db, email)
     if not user:
+        # Burn the same hashing time as a real check to avoid user enumeration
+        # _dummy_hash() is resolved in the worker thread too: its first call hashes
+        await anyio.to_thread.run_sync(lambda: verify_password(password, _dummy_hash()))
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await anyio.to_thread.run_sync(
+        pwd_context.verify_and_update, password, user.hashed_password
+    )
+    if not verified:
         return None
     if not user.is_active:
         return None
+    if new_hash is not None:
+        # Hash was made with a different cost factor; store one at the current BCRYPT_ROUNDS
+        async with transaction(db):
+            user.hashed_password = new_hash
     return user
\ No newline at end of file
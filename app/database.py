@@ -1,12 +1,49 @@
+from contextlib import asynccontextmanager
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
 
+def _engine_options() -> dict:
+    """Pool and driver options for the async engine."""
+    options = {}
+    connect_args = {}
+    is_asyncpg = make_url(settings.DATABASE_URL).get_driver_name() == "asyncpg"
+
+    if settings.DB_USE_PGBOUNCER:
+        # PgBouncer owns the pooling and can't track per-connection prepared statements
+        options["poolclass"] = NullPool
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            # Unique names: in transaction pooling another client may already own "__asyncpg_stmt_1__"
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_use_lifo=True,  # Reuse warm connections; idle extras age out via pool_recycle
+        )
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+            connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,  # Set to True for SQL query logging during development
-    future=True
+    future=True,
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    **_engine_options()
 )
 
 # Create async session factory
@@ -28,4 +65,29 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+@asynccontextmanager
+async def transaction(session: AsyncSession, serializable: bool = False):
+    """
+    Explicit transaction block: commits on success, rolls back on any exception.
+    Pass serializable=True for read-modify-write sequences that must not interleave.
+    Usage: async with transaction(db): ...
+    """
+    if session.in_transaction():
+        # An earlier read in this request already began the transaction; finish it here
+        if serializable:
+            raise RuntimeError("serializable=True must be requested before the session's first statement")
+        try:
+            yield session
+        except BaseException:
+            await session.rollback()
+            raise
+        await session.commit()
+        return
+    
+    async with session.begin():
+        if serializable:
+            await session.connection(execution_options={"isolation_level": "SERIALIZABLE"})
+        yield session
@@ -1,3 +1,5 @@
+from functools import lru_cache
+from fastapi import Request
 from qdrant_client import QdrantClient, AsyncQdrantClient
 from llama_index.core import Settings
 from llama_index.embeddings.gemini import GeminiEmbedding
@@ -14,9 +16,12 @@ def setup_embedding_model():
     if embedding_choice == "local":
         try:
             print("INFO: Configuring local embedding model (no API required)...")
+            # One backend only: the collection's vectors (and the BGE query instruction
+            # prepended to queries) must come from the same model build as at ingest time
             Settings.embed_model = HuggingFaceEmbedding(
                 model_name="BAAI/bge-small-en-v1.5",
-                cache_folder="./.embedding_cache"
+                cache_folder="./.embedding_cache",
+                embed_batch_size=settings.EMBED_BATCH_SIZE
             )
             print("✓ SUCCESS: Local embedding model (bge-small-en-v1.5) loaded successfully.")
             return
@@ -30,7 +35,8 @@ def setup_embedding_model():
                 print("INFO: Configuring OpenAI embedding model...")
                 Settings.embed_model = OpenAIEmbedding(
                     model="text-embedding-3-small",
-                    api_key=settings.OPENAI_API_KEY
+                    api_key=settings.OPENAI_API_KEY,
+                    embed_batch_size=settings.EMBED_BATCH_SIZE
                 )
                 print("✓ SUCCESS: OpenAI embedding model configured.")
                 return
@@ -51,35 +57,45 @@ def setup_embedding_model():
     else:
         raise RuntimeError("No valid embedding configuration found.")
 
-# Initialize embedding model at module load
-setup_embedding_model()
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    """
+    Dependency returning the embedding model, configured once per process.
+    The API lifespan warms it at startup so the first request doesn't pay the load;
+    migrations and scripts that never call this don't load it at all.
+    """
+    setup_embedding_model()
+    return Settings.embed_model
 
 
 # --- Qdrant Client Factory (called once in main.py lifespan) ---
-def get_qdrant_client() -> QdrantClient:
-    """Create sync Qdrant client"""
-    return QdrantClient(
+def _qdrant_client_options() -> dict:
+    """Connection options shared by the sync and async clients."""
+    return dict(
         url=settings.QDRANT_URL,
         api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None,
-        https=False
+        https=False,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        # Keep the long-lived gRPC channel open between bursts of traffic
+        grpc_options={"grpc.keepalive_time_ms": 30000},
+        timeout=settings.QDRANT_TIMEOUT
     )
 
+def get_qdrant_client() -> QdrantClient:
+    """Create sync Qdrant client"""
+    return QdrantClient(**_qdrant_client_options())
+
 def get_async_qdrant_client() -> AsyncQdrantClient:
     """Create async Qdrant client"""
-    return AsyncQdrantClient(
-        url=settings.QDRANT_URL,
-        api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None,
-        https=False
-    )
+    return AsyncQdrantClient(**_qdrant_client_options())
 
 
-# --- Dependencies for injection (return the global clients) ---
-def get_qdrant_client_dependency():
+# --- Dependencies for injection (return the clients created in lifespan) ---
+def get_qdrant_client_dependency(request: Request) -> QdrantClient:
     """Dependency to inject sync Qdrant client"""
-    from app.main import qdrant_client
-    return qdrant_client
+    return request.app.state.qdrant_client
 
-def get_async_qdrant_client_dependency():
+def get_async_qdrant_client_dependency(request: Request) -> AsyncQdrantClient:
     """Dependency to inject async Qdrant client"""
-    from app.main import async_qdrant_client
-    return async_qdrant_client
\ No newline at end of file
+    return request.app.state.async_qdrant_client
@@ -1,24 +1,117 @@
-
+from functools import lru_cache
+from fastapi import Depends, HTTPException, status
 from llama_index.core import VectorStoreIndex
-from fastapi import Depends
+from llama_index.core.settings import Settings
+from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.llms.gemini import Gemini
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from app.core.config import settings
-from .common import get_qdrant_client # Assuming get_qdrant_client is defined here
+from .common import get_qdrant_client_dependency, get_async_qdrant_client_dependency, get_embedding_model
+
+RERANKER_MODEL = "cross-encoder/ms-marco-TinyBERT-L-2"
+
+# Shared index over the Qdrant collection (built once, reused by every request)
+_vector_index = None
+
 
-# 1. Define the Index as a Reusable Dependency
-def get_vector_index(qdrant_client=Depends(get_qdrant_client)):
+def get_vector_index(
+    qdrant_client = Depends(get_qdrant_client_dependency),
+    async_qdrant_client = Depends(get_async_qdrant_client_dependency),
+    embed_model = Depends(get_embedding_model)
+) -> VectorStoreIndex:
     """
-    Creates a LlamaIndex VectorStoreIndex wrapper around the Qdrant client.
+    Dependency returning the process-wide VectorStoreIndex.
+    Filters and top-k are per-request retriever options, so one index serves all tenants.
     """
-    # Use the configured Qdrant collection
-    vector_store = QdrantVectorStore(
-        client=qdrant_client,
-        collection_name=settings.QDRANT_COLLECTION,
-    )
+    global _vector_index
+    if _vector_index is None:
+        vector_store = QdrantVectorStore(
+            client=qdrant_client,
+            aclient=async_qdrant_client,
+            collection_name=settings.QDRANT_COLLECTION
+        )
+        _vector_index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+    return _vector_index
+
+
+def _reranker_device() -> str:
+    if settings.RERANKER_DEVICE:
+        return settings.RERANKER_DEVICE
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
 
-    # Initialize the index, which links LlamaIndex to the vector store
-    index = VectorStoreIndex.from_vector_store(
-        vector_store=vector_store,
-        service_context=settings.SERVICE_CONTEXT # Use the global ServiceContext
+
+def _quantized_cpu_model():
+    """int8 ONNX Runtime build of the cross-encoder; None when the ONNX backend isn't installed."""
+    try:
+        from sentence_transformers import CrossEncoder
+        model_kwargs = {
+            "file_name": settings.RERANKER_ONNX_FILE,
+            "provider": "CPUExecutionProvider"
+        }
+        if settings.RERANKER_ONNX_THREADS:
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = settings.RERANKER_ONNX_THREADS
+            model_kwargs["session_options"] = session_options
+        return CrossEncoder(
+            RERANKER_MODEL,
+            device="cpu",
+            backend="onnx",
+            model_kwargs=model_kwargs
+        )
+    except ImportError as e:
+        print(f"WARNING: ONNX reranker unavailable ({e}); using the torch model")
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> SentenceTransformerRerank:
+    """Dependency returning the cross-encoder reranker (model loaded once per process)."""
+    device = _reranker_device()
+    reranker = None
+    if device == "cpu" and settings.RERANKER_ONNX_FILE:
+        # Dynamic int8 weights run on VNNI dot-product instructions on modern x86
+        onnx_model = _quantized_cpu_model()
+        if onnx_model is not None:
+            # model_construct skips __init__, which would otherwise load the torch weights too
+            reranker = SentenceTransformerRerank.model_construct(
+                model=RERANKER_MODEL,
+                top_n=3,
+                device=device
+            )
+            reranker._model = onnx_model
+    if reranker is None:
+        reranker = SentenceTransformerRerank(
+            model=RERANKER_MODEL,
+            top_n=3,
+            device=device
+        )
+    # All top-k pairs are scored in a single predict() batch; this bounds how far they are padded
+    reranker._model.max_length = settings.RERANKER_MAX_LENGTH
+    if device.startswith("cuda"):
+        # FP16 halves weight/activation memory; scores are only used for ordering
+        reranker._model.half()
+    return reranker
+
+
+@lru_cache(maxsize=1)
+def _build_llm() -> Gemini:
+    Settings.llm = Gemini(
+        model="gemini-2.0-flash",
+        api_key=settings.GEMINI_API_KEY
     )
-    return index
\ No newline at end of file
+    return Settings.llm
+
+
+def get_llm() -> Gemini:
+    """Dependency returning the Gemini LLM, also registered as the LlamaIndex default."""
+    if not settings.GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="GEMINI_API_KEY not configured"
+        )
+    return _build_llm()
@@ -1,15 +1,21 @@
 from app.routers import webhooks
 from app.routers import admin
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
+import os
+import anyio.to_thread
 from app.core.config import settings
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.database import engine
 from app.routers import ingestion, query, auth
-from app.dependencies.common import get_qdrant_client, get_async_qdrant_client
-
-# Global Qdrant clients
-qdrant_client = None
-async_qdrant_client = None
-
+from app.dependencies.common import get_qdrant_client, get_async_qdrant_client, get_embedding_model
+from app.dependencies.rag import get_vector_index, get_reranker, get_llm
+from app.utils.filters import ensure_payload_indexes
+from app.utils.qdrant_collection import ensure_quantization
+from app.utils.text_extraction import shutdown_pdf_pool
+from app.utils.webhooks import close_http_client
+from app.utils.query_log_writer import start_query_log_writer, stop_query_log_writer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,23 +23,50 @@ async def lifespan(app: FastAPI):
     Lifespan event handler for startup and shutdown.
     Initializes Qdrant clients once and reuses them.
     """
-    global qdrant_client, async_qdrant_client
-    
     print("🚀 Starting up...")
-    # Initialize Qdrant clients
-    qdrant_client = get_qdrant_client()
-    async_qdrant_client = get_async_qdrant_client()
+    # Request-path logs go through a queue so handlers never block on stderr
+    setup_logging()
+    # Password hashing runs in worker threads; allow at least one per core
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, os.cpu_count() or 1)
+
+    # Initialize Qdrant clients (one connection each, shared by all requests)
+    qdrant_client = app.state.qdrant_client = get_qdrant_client()
+    async_qdrant_client = app.state.async_qdrant_client = get_async_qdrant_client()
     print("✅ Qdrant clients initialized")
+    try:
+        await ensure_payload_indexes(async_qdrant_client, settings.QDRANT_COLLECTION)
+    except Exception as e:
+        print(f"WARNING: Could not ensure Qdrant payload indexes: {e}")
+    try:
+        await ensure_quantization(async_qdrant_client, settings.QDRANT_COLLECTION)
+    except Exception as e:
+        print(f"WARNING: Could not enable Qdrant quantization: {e}")
+
+    # Warm the shared embedding model so the first upload/query doesn't pay the load
+    app.state.embed_model = await anyio.to_thread.run_sync(get_embedding_model)
+
+    # Build the RAG components once instead of per request
+    get_vector_index(qdrant_client, async_qdrant_client, app.state.embed_model)
+    await anyio.to_thread.run_sync(get_reranker)
+    if settings.GEMINI_API_KEY:
+        get_llm()
+    print("✅ RAG components initialized")
+
+    # Query logs are queued by handlers and inserted in batches by one background task
+    start_query_log_writer()
     
     yield
     
     print("🛑 Shutting down...")
+    await stop_query_log_writer()
     # Cleanup
-    if async_qdrant_client:
-        await async_qdrant_client.close()
-    if qdrant_client:
-        qdrant_client.close()
+    await async_qdrant_client.close()
+    qdrant_client.close()
+    shutdown_pdf_pool()
+    await close_http_client()
     print("✅ Cleanup complete")
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -43,6 +76,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Compress JSON bodies (answers + source previews); SSE streams are left uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(ingestion.router, prefix="/api/v1/ingestion", tags=["Ingestion"])
@@ -64,4 +100,19 @@ async def health_check():
         "status": "healthy",
         "database": "connected",
         "qdrant": "connected"
-    }
\ No newline at end of file
+    }
+
+
+if settings.DEBUG_ENDPOINTS:
+    @app.get("/debug/pool", tags=["Health Check"])
+    async def pool_status():
+        """Database connection pool usage"""
+        pool = engine.pool
+        stats = {"status": pool.status()}
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow()
+            )
+        return stats
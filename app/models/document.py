@@ -1,7 +1,9 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum as SQLEnum, Text, Boolean, DateTime, JSON
+from sqlalchemy import Column, String, Integer, BigInteger, Identity, ForeignKey, Enum as SQLEnum, Text, Boolean, DateTime, JSON, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base import Base, TimestampMixin
 from .enums import DocumentStatus
+import enum
 import uuid
 from datetime import datetime
 
@@ -36,7 +38,7 @@ class Tenant(Base, TimestampMixin):
     
     # Relationships
     owner = relationship("User", back_populates="tenant")
-    documents = relationship("Document", back_populates="tenant", cascade="all, delete-orphan")
+    documents = relationship("Document", back_populates="tenant", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Tenant {self.name}>"
@@ -45,9 +47,14 @@ class Tenant(Base, TimestampMixin):
 
 class Document(Base, TimestampMixin):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Tenant-scoped keyset listing; the leading tenant_id also serves plain tenant filters
+        Index("ix_documents_tenant_created_id", "tenant_id", text("created_at DESC"), text("id DESC")),
+        Index("ix_documents_tenant_category", "tenant_id", "category"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
     filename = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)  # in bytes
     file_type = Column(String, nullable=False)
@@ -83,11 +90,30 @@ class Document(Base, TimestampMixin):
             "description": self.description,
         }
 
+    # Keys every chunk needs: tenant isolation, query filters, and source attribution
+    CHUNK_METADATA_KEYS = ("tenant_id", "document_id", "file_name", "file_type", "category", "tags", "upload_date")
+
+    def to_chunk_metadata(self):
+        """Per-chunk Qdrant payload; document-level details (size, description) stay in Postgres"""
+        metadata = self.to_metadata_dict()
+        return {key: metadata[key] for key in self.CHUNK_METADATA_KEYS}
+
 class QueryLog(Base, TimestampMixin):
     __tablename__ = "query_logs"
-    
-    id = Column(String, primary_key=True, default=generate_uuid)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
+    __table_args__ = (
+        # INCLUDE columns let the analytics aggregates run as index-only scans
+        Index(
+            "ix_query_logs_tenant_created",
+            "tenant_id",
+            text("created_at DESC"),
+            postgresql_include=["success", "response_time_ms"],
+        ),
+        Index("ix_query_logs_created_at", "created_at"),  # Cross-tenant analytics window
+    )
+    
+    # Append-only and never referenced externally: an 8-byte DB-generated key keeps the PK index small
+    id = Column(BigInteger, Identity(), primary_key=True)
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
     query_text = Column(Text, nullable=False)
     
     # Filters used
@@ -104,11 +130,27 @@ class QueryLog(Base, TimestampMixin):
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
     
-    # Relationship
+    # Relationships
     tenant = relationship("Tenant")
+    document_links = relationship("QueryLogDocument", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<QueryLog {self.id} - Tenant {self.tenant_id}>"
+
+
+class QueryLogDocument(Base):
+    """Document IDs a query was filtered to, one row each (feeds popular-documents analytics)"""
+    __tablename__ = "query_log_documents"
+    __table_args__ = (
+        Index("ix_query_log_documents_document_log", "document_id", "query_log_id"),
+    )
+    
+    query_log_id = Column(BigInteger, ForeignKey("query_logs.id", ondelete="CASCADE"), primary_key=True)
+    # No FK: filter values are user input and may name documents that no longer exist
+    document_id = Column(String, primary_key=True)
+    
+    def __repr__(self):
+        return f"<QueryLogDocument {self.query_log_id} - {self.document_id}>"
     
 
 class WebhookEvent(str, enum.Enum):
@@ -119,11 +161,16 @@ class WebhookEvent(str, enum.Enum):
 
 class Webhook(Base, TimestampMixin):
     __tablename__ = "webhooks"
+    __table_args__ = (
+        # Event membership (events @> '["..."]') is matched in SQL by trigger_webhook
+        Index("ix_webhooks_events", "events", postgresql_using="gin"),
+        Index("ix_webhooks_tenant_active", "tenant_id", postgresql_where=text("is_active")),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
     url = Column(String, nullable=False)
-    events = Column(JSON, nullable=False)  # List of events to subscribe to
+    events = Column(JSONB, nullable=False)  # List of events to subscribe to
     secret = Column(String, nullable=False)  # For signature verification
     is_active = Column(Boolean, default=True, nullable=False)
     
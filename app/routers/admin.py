@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete, func, case, cast, Date, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from pydantic import TypeAdapter
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, transaction
+from app.utils.cache import get_cached_analytics, set_cached_analytics, invalidate_analytics, invalidate_tenant
+from app.utils.pagination import encode_cursor, decode_cursor
 from app.models.document import Tenant, User, Document
 from app.schemas.admin_schema import (
     TenantCreate,
@@ -15,54 +18,83 @@ from app.schemas.admin_schema import (
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+_tenant_list_adapter = TypeAdapter(List[TenantResponse])
+
 
 @router.get("/tenants", response_model=TenantListResponse)
 async def list_tenants(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
-    """List all tenants in the system."""
-    result = await db.execute(select(Tenant))
-    tenants = result.scalars.all()
+    """List tenants, newest first. Pass next_cursor back as cursor for the next page."""
+    # Only the response columns; owner email via a JOIN (one round trip)
+    stmt = (
+        select(
+            Tenant.id,
+            Tenant.name,
+            Tenant.owner_id,
+            Tenant.max_documents,
+            Tenant.max_queries_per_day,
+            Tenant.created_at,
+            func.coalesce(User.email, "N/A").label("owner_email")
+        )
+        .outerjoin(User, User.id == Tenant.owner_id)
+        .order_by(Tenant.created_at.desc(), Tenant.id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Tenant.created_at, Tenant.id) < (cursor_created_at, cursor_id))
 
-    tenant_responses = []
-    for tenant in tenants:
-        owner_result = await db.execute(select(User).where(User.id == tenant.owner_id))
-        owner = owner_result.scalar_one_or_none()
+    result = await db.execute(stmt)
+    rows = result.all()
 
-        tenant_responses.append(TenantResponse(
-            id=tenant.id,
-            name=tenant.name,
-            owner_id=tenant.owner_id,
-            owner_email=owner.email if owner else "N/A",
-            max_documents = tenants.max_documents,
-            max_queries_per_day=tenant.max_queries_per_day,
-            created_at=tenant.created_at
-        ))
+    # Validate the whole page in one pass through pydantic-core
+    tenant_responses = _tenant_list_adapter.validate_python(rows, from_attributes=True)
 
-        return TenantListResponse(total=len(tenant_responses), tenants=tenant_responses)
-    
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
 
+    # COUNT(*) scans the whole table, so only on request
+    total = None
+    if include_total:
+        total_result = await db.execute(select(func.count()).select_from(Tenant))
+        total = total_result.scalar()
 
-@router.get("tenants/{tenant_id}/stats", response_model=TenantStatsResponse)
+    return TenantListResponse(total=total, tenants=tenant_responses, next_cursor=next_cursor)
+
+
+@router.get("/tenants/{tenant_id}/stats", response_model=TenantStatsResponse)
 async def get_tenant_stats(tenant_id: str, db: AsyncSession = Depends(get_db)):
     """Get usage stats for a tenant."""
-    result = await db.execute(select(Tenant).where(Tenant.id == tenant_id))
-    tenant = result.scalar_one_or_none()
+    # Tenant lookup, document count and storage total in one round trip
+    result = await db.execute(
+        select(
+            Tenant.id,
+            Tenant.name,
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.file_size), 0)
+        )
+        .outerjoin(Document, Document.tenant_id == Tenant.id)
+        .where(Tenant.id == tenant_id)
+        .group_by(Tenant.id, Tenant.name)
+    )
+    row = result.first()
 
-    if not tenant:
-        raise HTTPException(status_code=404, message="Tenant not found")
+    if not row:
+        raise HTTPException(status_code=404, detail="Tenant not found")
     
-    doc_result = await db.execute(select(func.count()).select_from(Document).where(Document.tenant_id == tenant_id))
-    doc_count = doc_result.scalar()
+    _, tenant_name, doc_count, total_bytes = row
     
     # Calculate storage
-    size_result = await db.execute(select(func.sum(Document.file_size)).where(Document.tenant_id == tenant_id))
-    total_bytes = size_result.scalar() or 0
     storage_mb = total_bytes / (1024 * 1024)
     
     return TenantStatsResponse(
-        tenant_id=tenant.id,
-        tenant_name=tenant.name,
+        tenant_id=tenant_id,
+        tenant_name=tenant_name,
         document_count=doc_count,
         total_queries=0,  # TODO: Implement query logging
         storage_used_mb=round(storage_mb, 2)
@@ -123,18 +155,21 @@ async def delete_tenant(
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a tenant and all associated data"""
-    result = await db.execute(select(Tenant).where(Tenant.id == tenant_id))
-    tenant = result.scalar_one_or_none()
-    
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
+    # One statement; documents and query logs go via ON DELETE CASCADE
+    async with transaction(db):
+        result = await db.execute(
+            delete(Tenant).where(Tenant.id == tenant_id).returning(Tenant.id)
+        )
+        
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Tenant not found")
     
-    await db.delete(tenant)
-    await db.commit()
+    invalidate_analytics(tenant_id)
+    invalidate_tenant(tenant_id)
     
     return {"status": "success", "message": f"Tenant {tenant_id} deleted"}
 
-from app.models.document import QueryLog
+from app.models.document import QueryLog, QueryLogDocument
 
 # Get query analytics
 @router.get("/analytics/queries")
@@ -146,23 +181,30 @@ async def get_query_analytics(
     """Get query analytics (optionally filtered by tenant)"""
     from datetime import timedelta
     
+    cache_key = ("queries", tenant_id, days)
+    cached = get_cached_analytics(cache_key)
+    if cached is not None:
+        return cached
+    
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
-    # Build query
-    stmt = select(QueryLog).where(QueryLog.created_at >= cutoff_date)
+    # Aggregate in the database; only one row comes back
+    stmt = select(
+        func.count(),
+        func.coalesce(func.sum(case((QueryLog.success == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(QueryLog.response_time_ms), 0)
+    ).where(QueryLog.created_at >= cutoff_date)
     if tenant_id:
         stmt = stmt.where(QueryLog.tenant_id == tenant_id)
     
     result = await db.execute(stmt)
-    logs = result.scalars().all()
+    total_queries, successful_queries, total_response_time = result.one()
     
     # Calculate stats
-    total_queries = len(logs)
-    successful_queries = sum(1 for log in logs if log.success)
     failed_queries = total_queries - successful_queries
-    avg_response_time = sum(log.response_time_ms for log in logs if log.response_time_ms) / total_queries if total_queries > 0 else 0
+    avg_response_time = total_response_time / total_queries if total_queries > 0 else 0
     
-    return {
+    response = {
         "period_days": days,
         "total_queries": total_queries,
         "successful_queries": successful_queries,
@@ -170,6 +212,8 @@ async def get_query_analytics(
         "success_rate": round(successful_queries / total_queries * 100, 2) if total_queries > 0 else 0,
         "avg_response_time_ms": round(avg_response_time, 2)
     }
+    set_cached_analytics(cache_key, response)
+    return response
 
 
 # Get queries over time
@@ -181,27 +225,29 @@ async def get_queries_over_time(
 ):
     """Get query count grouped by date"""
     from datetime import timedelta
-    from collections import defaultdict
+    
+    cache_key = ("queries-over-time", tenant_id, days)
+    cached = get_cached_analytics(cache_key)
+    if cached is not None:
+        return cached
     
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
-    stmt = select(QueryLog).where(QueryLog.created_at >= cutoff_date)
+    # Group by date in SQL
+    day = cast(QueryLog.created_at, Date).label("day")
+    stmt = select(day, func.count()).where(QueryLog.created_at >= cutoff_date)
     if tenant_id:
         stmt = stmt.where(QueryLog.tenant_id == tenant_id)
+    stmt = stmt.group_by(day).order_by(day)
     
     result = await db.execute(stmt)
-    logs = result.scalars().all()
-    
-    # Group by date
-    queries_by_date = defaultdict(int)
-    for log in logs:
-        date_key = log.created_at.date().isoformat()
-        queries_by_date[date_key] += 1
     
-    return {
+    response = {
         "period_days": days,
-        "data": [{"date": date, "count": count} for date, count in sorted(queries_by_date.items())]
+        "data": [{"date": date.isoformat(), "count": count} for date, count in result.all()]
     }
+    set_cached_analytics(cache_key, response)
+    return response
 
 
 # Get popular documents
@@ -212,26 +258,62 @@ async def get_popular_documents(
     db: AsyncSession = Depends(get_db)
 ):
     """Get most queried documents"""
-    from collections import Counter
+    cache_key = ("popular-documents", tenant_id, limit)
+    cached = get_cached_analytics(cache_key)
+    if cached is not None:
+        return cached
     
-    stmt = select(QueryLog)
+    # Count per document from the query_log_documents link table
+    query_count = func.count().label("query_count")
+    stmt = select(QueryLogDocument.document_id, query_count)
     if tenant_id:
-        stmt = stmt.where(QueryLog.tenant_id == tenant_id)
+        stmt = stmt.join(QueryLog, QueryLog.id == QueryLogDocument.query_log_id).where(QueryLog.tenant_id == tenant_id)
+    stmt = (
+        stmt.group_by(QueryLogDocument.document_id)
+        .order_by(query_count.desc())
+        .limit(limit)
+    )
     
     result = await db.execute(stmt)
-    logs = result.scalars().all()
     
-    # Count document mentions in filters
-    doc_counter = Counter()
-    for log in logs:
-        filters = log.filters_applied or {}
-        if "document_ids" in filters:
-            for doc_id in filters["document_ids"]:
-                doc_counter[doc_id] += 1
-    
-    return {
+    response = {
         "popular_documents": [
             {"document_id": doc_id, "query_count": count}
-            for doc_id, count in doc_counter.most_common(limit)
+            for doc_id, count in result.all()
         ]
-    }
\ No newline at end of file
+    }
+    set_cached_analytics(cache_key, response)
+    return response
+
+
+# Vector index maintenance
+from qdrant_client import models
+from app.core.config import settings
+from app.core.security import require_admin_tenant
+from app.dependencies.common import get_async_qdrant_client_dependency
+from app.utils.filters import ensure_payload_indexes
+
+@router.post("/index/bulk-mode", dependencies=[Depends(require_admin_tenant)])
+async def enable_bulk_ingest(
+    async_qdrant_client = Depends(get_async_qdrant_client_dependency)
+):
+    """Stop building the per-tenant HNSW graphs (payload_m=0) while a large batch of documents is uploaded"""
+    await async_qdrant_client.update_collection(
+        collection_name=settings.QDRANT_COLLECTION,
+        hnsw_config=models.HnswConfigDiff(m=0, payload_m=0)
+    )
+    return {"status": "success", "message": "HNSW indexing paused; call /admin/index/finalize when the batch is done"}
+
+
+@router.post("/index/finalize", dependencies=[Depends(require_admin_tenant)])
+async def finalize_index(
+    async_qdrant_client = Depends(get_async_qdrant_client_dependency)
+):
+    """Rebuild the per-tenant HNSW graphs (payload_m=16) once after a bulk upload; no global graph (m=0)"""
+    # With m=0 the graphs hang off the is_tenant tenant_id index; without it there is no graph at all
+    await ensure_payload_indexes(async_qdrant_client, settings.QDRANT_COLLECTION)
+    await async_qdrant_client.update_collection(
+        collection_name=settings.QDRANT_COLLECTION,
+        hnsw_config=models.HnswConfigDiff(m=0, payload_m=16)
+    )
+    return {"status": "success", "message": "HNSW indexing re-enabled"}
@@ -1,27 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta
-from jose import jwt
+from datetime import timedelta
+import time
+import jwt
 
 from app.database import get_db
 from app.schemas.auth_schema import UserRegister, UserLogin, Token, UserResponse
 from app.crud.user import create_user_with_tenant, authenticate_user, get_user_by_email
 from app.core.config import settings
-from app.core.security import get_current_tenant_id
+from app.core.security import get_current_tenant_id, jwt_key
 
 router = APIRouter()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Generate JWT token"""
-    to_encode = data.copy()
     if expires_delta:
-        expire = datetime.now() + expires_delta
+        ttl_seconds = int(expires_delta.total_seconds())
     else:
-        expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        ttl_seconds = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # exp is a UTC epoch int; time.time() is timezone-independent
+    to_encode = {**data, "exp": int(time.time()) + ttl_seconds}
+    encoded_jwt = jwt.encode(to_encode, jwt_key(), algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
@@ -99,24 +100,23 @@ async def get_current_user_info(
     Get current user's information.
     Requires valid JWT token.
     """
-    from app.models.document import Tenant
+    from app.models.document import Tenant, User
     from sqlalchemy import select
-    from sqlalchemy.orm import selectinload
 
-    
+    # Only the four response columns, one statement
     result = await db.execute(
-        select(Tenant)
-        .options(selectinload(Tenant.owner))
-         .where(Tenant.id == tenant_id)
+        select(User.id, User.email, Tenant.name)
+        .join(Tenant, Tenant.owner_id == User.id)
+        .where(Tenant.id == tenant_id)
     )
-    tenant = result.scalar_one_or_none()
+    row = result.first()
     
-    if not tenant:
+    if not row:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
     return UserResponse(
-        id=tenant.owner.id,
-        email=tenant.owner.email,
-        tenant_id=tenant.id,
-        tenant_name=tenant.name
+        id=row.id,
+        email=row.email,
+        tenant_id=tenant_id,
+        tenant_name=row.name
     )
\ No newline at end of file
@@ -1,24 +1,32 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
-from typing import Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import Optional, Tuple
+from sqlalchemy.orm import raiseload
+from sqlalchemy import select, update, delete, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import os
+import tempfile
 import uuid
+import json
+import tiktoken
+import anyio
+import anyio.to_thread
 
-from llama_index.core import Document as LlamaDocument, VectorStoreIndex
-from llama_index.core.settings import Settings
-from llama_index.llms.gemini import Gemini
-from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.core import Document as LlamaDocument
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.vector_stores.qdrant import QdrantVectorStore
+from llama_index.core.schema import MetadataMode, NodeRelationship, RelatedNodeInfo, TextNode
 from llama_index.core.vector_stores.types import MetadataFilters, ExactMatchFilter
+from qdrant_client.models import Filter, FieldCondition, MatchValue
 
-from app.dependencies.common import get_qdrant_client_dependency, get_async_qdrant_client_dependency
+from app.dependencies.common import get_async_qdrant_client_dependency
+from app.dependencies.rag import get_vector_index, get_reranker, get_llm
 from app.core.security import get_current_tenant_id
-from app.database import get_db
+from app.database import get_db, transaction, AsyncSessionLocal
 from app.core.config import settings
-from app.models.document import Document, Tenant, User, QueryLog
+from app.core.logging_config import logger
+from app.models.document import Document, Tenant, User, QueryLog, QueryLogDocument
 from app.models.enums import DocumentStatus
 from app.schemas.document_schema import (
     DocumentUploadRequest,
@@ -30,178 +38,348 @@ from app.schemas.document_schema import (
 from datetime import datetime
 
 from app.schemas.query_schema import QueryRequest, QueryResponse
-from app.utils.filters import build_metadata_filters, get_applied_filters_summary
+from app.utils.webhooks import dispatch_webhook
+from app.utils.query_log_writer import enqueue_query_log
+from app.utils.text_extraction import extract_text, SUPPORTED_FILE_TYPES
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.filters import build_metadata_filters, get_applied_filters_summary, ensure_payload_indexes
+from app.utils.qdrant_collection import ensure_quantization
+from app.utils.cache import (
+    make_answer_cache_key,
+    get_cached_answer,
+    set_cached_answer,
+    invalidate_answers,
+    get_cached_tenant_limit,
+    set_cached_tenant_limit
+)
 
 router = APIRouter()
 
+_UPLOAD_READ_CHUNK = 1 << 20
+
+# Upload indexing: nodes per embed + upsert call, and how many calls run at once
+_INSERT_BATCH_SIZE = 64
+_INSERT_CONCURRENCY = 4
+
+# Set once payload indexes/quantization have been checked after an insert in this process
+_collection_setup_done = False
+
+# Candidates fetched from Qdrant; the reranker keeps the best 3
+RETRIEVAL_TOP_K = 20
+
+# Built once: the constructor loads its tokenizer and sentence tokenizer.
+# Sizes are in cl100k tokens; 25% overlap keeps sentences that straddle a boundary retrievable.
+_splitter = SentenceSplitter(
+    chunk_size=512,
+    chunk_overlap=128,
+    tokenizer=tiktoken.get_encoding("cl100k_base").encode
+)
+
+
+async def _save_upload(file: UploadFile, suffix: str) -> Tuple[str, int]:
+    """
+    Copy an upload to a temp file in 1 MB chunks, rejecting it as soon as it passes MAX_UPLOAD_MB.
+    Returns (path, size); memory use stays at one chunk regardless of file size.
+    """
+    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        try:
+            while chunk := await file.read(_UPLOAD_READ_CHUNK):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds the {settings.MAX_UPLOAD_MB} MB upload limit"
+                    )
+                # Disk writes can block (slow volumes, full page cache); keep them off the event loop
+                await anyio.to_thread.run_sync(tmp.write, chunk)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    return tmp.name, size
+
+
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     category: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db),
-    qdrant_client = Depends(get_qdrant_client_dependency),
+    index = Depends(get_vector_index),
     async_qdrant_client = Depends(get_async_qdrant_client_dependency)
 ):
-    """Upload and index a document with metadata for filtering. Supports: PDF, DOCX, TXT files"""
-    
-    # 1. CHECK TENANT LIMITS
-    result = await db.execute(select(Tenant).where(Tenant.id == tenant_id))
-    tenant = result.scalar_one_or_none()
+    """
+    Upload a document with metadata for filtering. Supports: PDF, DOCX, TXT files.
+    Returns immediately with status "processing"; parsing and indexing run in the background.
+    """
     
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    
-    result = await db.execute(select(Document).where(Document.tenant_id == tenant_id))
-    doc_count = len(result.scalars().all())
+    # 1. CHECK TENANT LIMITS (one round trip either way)
+    max_documents = get_cached_tenant_limit(tenant_id)
+    if max_documents is None:
+        result = await db.execute(
+            select(Tenant.max_documents, func.count(Document.id).label("doc_count"))
+            .outerjoin(Document, Document.tenant_id == Tenant.id)
+            .where(Tenant.id == tenant_id)
+            .group_by(Tenant.id)
+        )
+        row = result.first()
+        
+        if row is None:
+            raise HTTPException(status_code=404, detail="Tenant not found")
+        max_documents, doc_count = row.max_documents, row.doc_count
+        set_cached_tenant_limit(tenant_id, max_documents)
+    else:
+        result = await db.execute(
+            select(func.count()).select_from(Document).where(Document.tenant_id == tenant_id)
+        )
+        doc_count = result.scalar_one()
     
-    if doc_count >= tenant.max_documents:
+    if doc_count >= max_documents:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Document limit reached ({tenant.max_documents} documents)"
+            detail=f"Document limit reached ({max_documents} documents)"
         )
     
+    # 2. SAVE FILE CONTENT
+    file_extension = file.filename.split('.')[-1].lower()
+    
+    if file_extension not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: .{file_extension}. Supported types: pdf, docx, txt")
+    
+    file_path, file_size = await _save_upload(file, suffix=f".{file_extension}")
+    
+    # 3. PARSE TAGS
+    tag_list = [tag.strip() for tag in tags.split(",")] if tags else []
+    
+    # 4. CREATE DATABASE RECORD
+    db_document = Document(
+        id=f"doc_{uuid.uuid4().hex[:12]}",
+        tenant_id=tenant_id,
+        filename=file.filename,
+        file_size=file_size,
+        file_type=file_extension,
+        status=DocumentStatus.PROCESSING,
+        category=category,
+        tags=tag_list,
+        description=description
+    )
     try:
-        # 2. READ FILE CONTENT
-        content = await file.read()
-        file_extension = file.filename.split('.')[-1].lower()
-        
-        if file_extension == 'pdf':
-            try:
-                from pypdf import PdfReader
-                import io
-                pdf_reader = PdfReader(io.BytesIO(content))
-                file_text = ""
-                for page in pdf_reader.pages:
-                    file_text += page.extract_text() + "\n"
-                if not file_text.strip():
-                    raise ValueError("PDF appears to be empty or unreadable")
-            except ImportError:
-                raise HTTPException(status_code=500, detail="PDF support not installed. Run: pip install pypdf")
-        
-        elif file_extension in ['docx', 'doc']:
-            try:
-                from docx import Document as DocxDocument
-                import io
-                docx = DocxDocument(io.BytesIO(content))
-                file_text = "\n".join([para.text for para in docx.paragraphs if para.text.strip()])
-                if not file_text.strip():
-                    raise ValueError("DOCX appears to be empty")
-            except ImportError:
-                raise HTTPException(status_code=500, detail="DOCX support not installed. Run: pip install python-docx")
-        
-        elif file_extension == 'txt':
-            try:
-                file_text = content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    file_text = content.decode('latin-1')
-                except:
-                    raise HTTPException(status_code=400, detail="Unable to decode text file. Please ensure it's UTF-8 or Latin-1 encoded.")
-        
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: .{file_extension}. Supported types: pdf, docx, txt")
+        async with transaction(db):
+            db.add(db_document)
+    except BaseException:
+        os.unlink(file_path)
+        raise
+    await db.refresh(db_document)
+    
+    metadata = db_document.to_metadata_dict()
+    
+    # 5. PARSE + INDEX AFTER THE RESPONSE (poll GET /documents/{id} for COMPLETED/FAILED)
+    background_tasks.add_task(
+        _ingest_document,
+        db_document.id,
+        tenant_id,
+        file_path,
+        file_extension,
+        db_document.to_chunk_metadata(),
+        index,
+        async_qdrant_client
+    )
+    
+    return DocumentUploadResponse(
+        status="processing",
+        document_id=db_document.id,
+        filename=db_document.filename,
+        file_size=db_document.file_size,
+        chunks_created=0,
+        metadata=metadata
+    )
+
+
+def _node_batches(chunks: list, metadata: dict, source: RelatedNodeInfo):
+    """Yield nodes for the chunk texts one batch at a time, so only in-flight batches exist."""
+    for i in range(0, len(chunks), _INSERT_BATCH_SIZE):
+        yield [
+            TextNode(text=chunk, metadata=dict(metadata), relationships={NodeRelationship.SOURCE: source})
+            for chunk in chunks[i:i + _INSERT_BATCH_SIZE]
+        ]
+
+
+async def _ensure_collection_setup(async_qdrant_client):
+    """
+    Payload indexes and quantization for the collection, checked once per process after
+    a first batch has landed (the first upload on a fresh deployment creates the collection).
+    """
+    global _collection_setup_done
+    if _collection_setup_done:
+        return
+    try:
+        await ensure_payload_indexes(async_qdrant_client, settings.QDRANT_COLLECTION)
+        await ensure_quantization(async_qdrant_client, settings.QDRANT_COLLECTION)
+        _collection_setup_done = True
+    except Exception:
+        logger.exception("Could not set up Qdrant collection %s", settings.QDRANT_COLLECTION)
+
+
+async def _insert_nodes_streaming(index, batches, async_qdrant_client):
+    """
+    Embed + upsert node batches as they are produced, several batches in flight at once.
+    insert_nodes is blocking, so each batch runs in a worker thread; the first batch
+    goes alone so only one call can create the collection if it doesn't exist yet.
+    A batch is dropped as soon as its upsert returns.
+    """
+    first = next(batches, None)
+    if first is None:
+        return
+    await anyio.to_thread.run_sync(index.insert_nodes, first)
+    del first
+    await _ensure_collection_setup(async_qdrant_client)
+    
+    async def worker(receive):
+        async with receive:
+            async for batch in receive:
+                await anyio.to_thread.run_sync(index.insert_nodes, batch)
+    
+    # Unbuffered: the producer only builds the next batch once a worker is free for it
+    send, receive = anyio.create_memory_object_stream(0)
+    async with anyio.create_task_group() as tg:
+        async with receive:
+            for _ in range(_INSERT_CONCURRENCY):
+                tg.start_soon(worker, receive.clone())
+        async with send:
+            for batch in batches:
+                await send.send(batch)
+
+
+async def _ingest_document(
+    document_id: str,
+    tenant_id: str,
+    file_path: str,
+    file_extension: str,
+    metadata: dict,
+    index,
+    async_qdrant_client
+):
+    """Parse, chunk, embed and index an uploaded document, then record the outcome."""
+    try:
+        await _index_document(document_id, tenant_id, file_path, file_extension, metadata, index, async_qdrant_client)
+    finally:
+        os.unlink(file_path)
+
+
+async def _index_document(
+    document_id: str,
+    tenant_id: str,
+    file_path: str,
+    file_extension: str,
+    metadata: dict,
+    index,
+    async_qdrant_client
+):
+    # Short sessions only: no pooled connection is held while parsing and embedding
+    async with AsyncSessionLocal() as db:
+        filename = (await db.execute(
+            select(Document.filename).where(Document.id == document_id)
+        )).scalar_one_or_none()
+    if filename is None:
+        # Deleted before processing started
+        return
+    
+    try:
+        # Parsing is CPU-bound; keep it off the event loop
+        file_text = await extract_text(file_path, file_extension)
         
         if not file_text or len(file_text.strip()) < 10:
-            raise HTTPException(status_code=400, detail="Document is too short or empty. Please upload a document with meaningful content.")
-        
-        # 3. PARSE TAGS
-        tag_list = [tag.strip() for tag in tags.split(",")] if tags else []
-        
-        # 4. CREATE DATABASE RECORD
-        db_document = Document(
-            id=f"doc_{uuid.uuid4().hex[:12]}",
-            tenant_id=tenant_id,
-            filename=file.filename,
-            file_size=len(content),
-            file_type=file_extension,
-            status=DocumentStatus.PROCESSING,
-            category=category,
-            tags=tag_list,
-            description=description
-        )
-        db.add(db_document)
-        await db.commit()
-        await db.refresh(db_document)
-        
-        # 5. PREPARE METADATA FOR QDRANT
-        metadata = db_document.to_metadata_dict()
-        
-        # 6. CREATE LLAMAINDEX DOCUMENT
-        llama_doc = LlamaDocument(text=file_text, metadata=metadata, id_=db_document.id)
-        
-        # 7. SPLIT INTO CHUNKS
-        splitter = SentenceSplitter(chunk_size=512, chunk_overlap=50)
-        nodes = splitter.get_nodes_from_documents([llama_doc])
+            raise ValueError("Document is too short or empty. Please upload a document with meaningful content.")
         
-        for node in nodes:
-            node.metadata.update(metadata)
+        # CREATE LLAMAINDEX DOCUMENT
+        llama_doc = LlamaDocument(text=file_text, metadata=metadata, id_=document_id)
         
-        # 8. INDEX IN QDRANT
-        vector_store = QdrantVectorStore(
-            client=qdrant_client,
-            aclient=async_qdrant_client,
-            collection_name=settings.QDRANT_COLLECTION
+        # SPLIT INTO CHUNK TEXTS (sized to leave room for the metadata embedded with each chunk)
+        chunks = _splitter.split_text_metadata_aware(
+            file_text,
+            metadata_str=llama_doc.get_metadata_str(mode=MetadataMode.EMBED)
         )
-        index = VectorStoreIndex.from_vector_store(vector_store)
-        index.insert_nodes(nodes)
+        chunk_count = len(chunks)
+        source = llama_doc.as_related_node_info()
+        # The full text isn't needed past this point
+        del file_text, llama_doc
         
-        # 9. UPDATE DATABASE STATUS
-        db_document.status = DocumentStatus.COMPLETED
-        db_document.chunk_count = len(nodes)
-        db_document.processed_at = datetime.utcnow()
-        await db.commit()
-
-        # ← Trigger webhook
-        from app.utils.webhooks import trigger_webhook
-        await trigger_webhook(
-        db=db,
-        tenant_id=tenant_id,
-        event="document.uploaded",
-        payload={
-        "document_id": db_document.id,
-        "filename": db_document.filename,
-        "chunks_created": len(nodes)
-    }
-)
-        
-        return DocumentUploadResponse(
-            status="success",
-            document_id=db_document.id,
-            filename=db_document.filename,
-            file_size=db_document.file_size,
-            chunks_created=len(nodes),
-            metadata=metadata
-        )
-        
-    except HTTPException:
-        raise
+        # INDEX IN QDRANT (nodes and embeddings only ever exist for the batches in flight)
+        await _insert_nodes_streaming(index, _node_batches(chunks, metadata, source), async_qdrant_client)
+        del chunks
         
     except Exception as e:
-        if 'db_document' in locals():
-            try:
-                db_document.status = DocumentStatus.FAILED
-                db_document.error_message = str(e)
+        logger.exception("Upload failed for tenant %s (document %s)", tenant_id, document_id)
+        # Concurrent batches fail as an ExceptionGroup; record the underlying error
+        while isinstance(e, BaseExceptionGroup):
+            e = e.exceptions[0]
+        try:
+            # Batches that landed before the failure would otherwise stay searchable
+            await async_qdrant_client.delete(
+                collection_name=settings.QDRANT_COLLECTION,
+                points_selector=document_points_filter(document_id, tenant_id)
+            )
+        except Exception:
+            logger.exception("Could not remove indexed chunks of failed document %s", document_id)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Document)
+                    .where(Document.id == document_id)
+                    .values(status=DocumentStatus.FAILED, error_message=str(e))
+                )
                 await db.commit()
-
+                
                 from app.utils.webhooks import trigger_webhook
                 await trigger_webhook(
                     db=db,
                     tenant_id=tenant_id,
                     event="document.failed",
                     payload={
-                    "document_id": db_document.id,
-                    "filename": db_document.filename,
-                    "error": str(e)
+                        "document_id": document_id,
+                        "filename": filename,
+                        "error": str(e)
                     }
-                )    
-            except:
-                await db.rollback()
-        
-        print(f"Upload error for tenant {tenant_id}: {type(e).__name__}: {e}")
-        raise HTTPException(status_code=500, detail=f"Document upload failed: {type(e).__name__}")
+                )
+        except Exception:
+            logger.exception("Could not record failure for document %s", document_id)
+        return
+    
+    # UPDATE DATABASE STATUS (RETURNING tells us whether the row still exists)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(status=DocumentStatus.COMPLETED, chunk_count=chunk_count, processed_at=datetime.utcnow())
+            .returning(Document.id)
+        )
+        completed = result.scalar_one_or_none() is not None
+        await db.commit()
+    
+    if not completed:
+        # Deleted while indexing: the delete ran before some batches landed, so drop them now
+        await async_qdrant_client.delete(
+            collection_name=settings.QDRANT_COLLECTION,
+            points_selector=document_points_filter(document_id, tenant_id)
+        )
+        return
+    
+    invalidate_answers(tenant_id)
+    
+    # ← Trigger webhook
+    await dispatch_webhook(
+        tenant_id=tenant_id,
+        event="document.uploaded",
+        payload={
+            "document_id": document_id,
+            "filename": filename,
+            "chunks_created": chunk_count
+        }
+    )
 
 
 @router.post("/documents/{document_id}/search")
@@ -210,19 +388,27 @@ async def search_in_document(
     query: str,
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db),
-    qdrant_client = Depends(get_qdrant_client_dependency),
-    async_qdrant_client = Depends(get_async_qdrant_client_dependency)
+    index = Depends(get_vector_index),
+    reranker = Depends(get_reranker),
+    llm = Depends(get_llm)
 ):
     """Search within a specific document only."""
     
-    # 1. VERIFY DOCUMENT EXISTS AND BELONGS TO USER
+    # 1. VERIFY DOCUMENT EXISTS AND BELONGS TO USER (only the columns the response needs)
     result = await db.execute(
-        select(Document).where(
+        select(
+            Document.id,
+            Document.filename,
+            Document.category,
+            Document.tags,
+            Document.chunk_count,
+            Document.status
+        ).where(
             Document.id == document_id,
             Document.tenant_id == tenant_id
         )
     )
-    document = result.scalar_one_or_none()
+    document = result.first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -240,14 +426,9 @@ async def search_in_document(
         document_ids=[document_id]
     )
     
-    # 4. CALL THE MAIN QUERY FUNCTION
+    # 4. RUN THE SHARED QUERY PIPELINE
     try:
-        result = await ask_question(
-            request=request,
-            tenant_id=tenant_id,
-            qdrant_client=qdrant_client,
-            async_qdrant_client=async_qdrant_client
-        )
+        result = await run_query(request, tenant_id, index, reranker, llm)
         
         # 5. ENHANCE RESPONSE WITH DOCUMENT INFO
         return {
@@ -264,7 +445,7 @@ async def search_in_document(
         }
     
     except Exception as e:
-        print(f"Search error in document {document_id}: {e}")
+        logger.exception("Search failed in document %s", document_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Search failed: {type(e).__name__}"
@@ -273,43 +454,54 @@ async def search_in_document(
 
 @router.get("/documents", response_model=DocumentListResponse)
 async def list_documents(
-    page: int = 1,
-    page_size: int = 50,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     status_filter: Optional[DocumentStatus] = None,
+    include_total: bool = False,
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db)
 ):
-    """List all documents for the current tenant with optional filtering"""
-    
-    # Build query
-    stmt = select(Document).where(Document.tenant_id == tenant_id)
-    
-    if category:
-        stmt = stmt.where(Document.category == category)
-    if status_filter:
-        stmt = stmt.where(Document.status == status_filter)
-    
-    # Get total count
-    count_stmt = select(func.count()).select_from(Document).where(Document.tenant_id == tenant_id)
+    """
+    List the current tenant's documents, newest first, with optional filtering.
+    Pass next_cursor back as cursor for the next page.
+    """
+    filters = [Document.tenant_id == tenant_id]
     if category:
-        count_stmt = count_stmt.where(Document.category == category)
+        filters.append(Document.category == category)
     if status_filter:
-        count_stmt = count_stmt.where(Document.status == status_filter)
+        filters.append(Document.status == status_filter)
     
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar()
+    # Build query (raiseload guards against per-row lazy loads during serialization)
+    # Keyset pagination walks ix_documents_tenant_created_id instead of scanning past an OFFSET
+    stmt = (
+        select(Document)
+        .options(raiseload("*"))
+        .where(*filters)
+        .order_by(Document.created_at.desc(), Document.id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Document.created_at, Document.id) < (cursor_created_at, cursor_id))
     
-    # Get paginated results
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
     result = await db.execute(stmt)
     documents = result.scalars().all()
     
+    next_cursor = None
+    if len(documents) == limit:
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id)
+    
+    # COUNT(*) visits every matching row, so only on request
+    total = None
+    if include_total:
+        total_result = await db.execute(select(func.count()).select_from(Document).where(*filters))
+        total = total_result.scalar_one()
+    
     return DocumentListResponse(
         total=total,
         documents=documents,
-        page=page,
-        page_size=page_size
+        next_cursor=next_cursor
     )
 
 
@@ -334,57 +526,49 @@ async def get_document(
     return document
 
 
+def document_points_filter(document_id: str, tenant_id: str) -> Filter:
+    """Qdrant filter selecting every chunk of one document, scoped to its tenant."""
+    return Filter(must=[
+        FieldCondition(key="tenant_id", match=MatchValue(value=tenant_id)),
+        FieldCondition(key="document_id", match=MatchValue(value=document_id))
+    ])
+
+
 @router.patch("/documents/{document_id}", response_model=DocumentResponse)
 async def update_document_metadata(
     document_id: str,
     update_data: DocumentUpdateRequest,
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db),
-    qdrant_client = Depends(get_qdrant_client_dependency)
+    async_qdrant_client = Depends(get_async_qdrant_client_dependency)
 ):
     """Update document metadata (category, tags, description)"""
-    result = await db.execute(
-        select(Document).where(
-            Document.id == document_id,
-            Document.tenant_id == tenant_id
-        )
-    )
-    document = result.scalar_one_or_none()
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    # Update fields if provided
-    if update_data.category is not None:
-        document.category = update_data.category
-    if update_data.tags is not None:
-        document.tags = update_data.tags
-    if update_data.description is not None:
-        document.description = update_data.description
-    
-    await db.commit()
-    await db.refresh(document)
+    # Update fields if provided; UPDATE ... RETURNING checks ownership and reloads in one statement
+    changes = update_data.model_dump(exclude_none=True)
+    owned = (Document.id == document_id, Document.tenant_id == tenant_id)
+    if changes:
+        stmt = update(Document).where(*owned).values(**changes).returning(Document)
+    else:
+        stmt = select(Document).where(*owned)
+    async with transaction(db):
+        result = await db.execute(stmt)
+        document = result.scalar_one_or_none()
+        
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+    invalidate_answers(tenant_id)
     
     # Update metadata in Qdrant
     try:
-        from qdrant_client.models import SetPayload, FieldCondition, Filter, MatchValue
-        
-        updated_metadata = document.to_metadata_dict()
+        updated_metadata = document.to_chunk_metadata()
         
-        qdrant_client.set_payload(
+        await async_qdrant_client.set_payload(
             collection_name=settings.QDRANT_COLLECTION,
             payload=updated_metadata,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="document_id",
-                        match=MatchValue(value=document_id)
-                    )
-                ]
-            )
+            points=document_points_filter(document_id, tenant_id)
         )
     except Exception as e:
-        print(f"Warning: Failed to update Qdrant metadata: {e}")
+        logger.warning("Failed to update Qdrant metadata for document %s: %s", document_id, e)
     
     return document
 
@@ -394,161 +578,233 @@ async def delete_document(
     document_id: str,
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db),
-    qdrant_client = Depends(get_qdrant_client_dependency)
+    async_qdrant_client = Depends(get_async_qdrant_client_dependency)
 ):
     """Delete a document from both database and vector store"""
-    result = await db.execute(
-        select(Document).where(
-            Document.id == document_id,
-            Document.tenant_id == tenant_id
+    # Both deletes are scoped to the tenant, so they can run at the same time;
+    # the DB row stays uncommitted until Qdrant succeeds (any raise below rolls it back)
+    async with transaction(db):
+        db_delete = db.execute(
+            delete(Document)
+            .where(Document.id == document_id, Document.tenant_id == tenant_id)
+            .returning(Document.id)
         )
-    )
-    document = result.scalar_one_or_none()
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    try:
-        # Delete from Qdrant
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
-        
-        qdrant_client.delete(
+        qdrant_delete = async_qdrant_client.delete(
             collection_name=settings.QDRANT_COLLECTION,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="document_id",
-                        match=MatchValue(value=document_id)
-                    )
-                ]
-            )
+            points_selector=document_points_filter(document_id, tenant_id)
         )
         
-        # Delete from database
-        await db.delete(document)
-        await db.commit()
+        # Wait for both before touching the session again, even if one fails
+        result, qdrant_result = await asyncio.gather(db_delete, qdrant_delete, return_exceptions=True)
+        error = next((r for r in (result, qdrant_result) if isinstance(r, Exception)), None)
+        if error is not None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to delete document: {str(error)}"
+            )
         
-        return {"status": "success", "message": f"Document {document_id} deleted"}
+        # RETURNING doubles as the ownership check
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+    invalidate_answers(tenant_id)
+    
+    return {"status": "success", "message": f"Document {document_id} deleted"}
+
+
+def new_query_log(tenant_id: str, request: QueryRequest, **fields) -> QueryLog:
+    """QueryLog for a request, with one query_log_documents row per filtered document"""
+    return QueryLog(
+        tenant_id=tenant_id,
+        query_text=request.query,
+        filters_applied=get_applied_filters_summary(request),
+        document_links=[
+            QueryLogDocument(document_id=document_id)
+            for document_id in dict.fromkeys(request.document_ids or [])
+        ],
+        **fields
+    )
+
+
+def log_query(tenant_id: str, request: QueryRequest, **fields):
+    """Hand a QueryLog to the batched background writer"""
+    enqueue_query_log(new_query_log(tenant_id, request, **fields))
+
+
+def extract_sources(source_nodes) -> list:
+    """Build the source list (with metadata) returned alongside an answer"""
+    sources = []
+    for node in source_nodes:
+        # Convert score to native Python float if it exists
+        score = None
+        if hasattr(node, 'score') and node.score is not None:
+            score = float(node.score)  # Convert numpy.float32 to Python float
         
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to delete document: {str(e)}"
-        )
+        source_info = {
+            "document_id": node.metadata.get("document_id", "N/A"),
+            "file_name": node.metadata.get("file_name", "N/A"),
+            "category": node.metadata.get("category", "uncategorized"),
+            "tags": node.metadata.get("tags", []),
+            "content_preview": node.text[:200] + "...",
+            "score": score
+        }
+        sources.append(source_info)
+    return sources
 
 
 @router.post("/ask", response_model=QueryResponse)
 async def ask_question(
     request: QueryRequest,
     tenant_id: str = Depends(get_current_tenant_id),
-    qdrant_client = Depends(get_qdrant_client_dependency), 
-    async_qdrant_client = Depends(get_async_qdrant_client_dependency), 
-    db: AsyncSession = Depends(get_db)
+    index = Depends(get_vector_index),
+    reranker = Depends(get_reranker),
+    llm = Depends(get_llm)
 ):
     """Query documents with optional filtering"""
-    if not settings.GEMINI_API_KEY:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-            detail="GEMINI_API_KEY not configured"
-        )
-    
-    start_time = datetime.now()
-    
+    return await run_query(request, tenant_id, index, reranker, llm)
 
-    try:
-        Settings.llm = Gemini(
-            model="gemini-2.0-flash",
-            api_key=settings.GEMINI_API_KEY
-        )
 
-        vector_store = QdrantVectorStore(
-            client=qdrant_client, 
-            aclient=async_qdrant_client,
-            collection_name=settings.QDRANT_COLLECTION
+async def run_query(request: QueryRequest, tenant_id: str, index, reranker, llm) -> QueryResponse:
+    """Shared /ask core: answer cache, retrieval + rerank + LLM, and query logging"""
+    start_time = datetime.now()
+    answer = ""
+    sources = []
+    
+    # Repeated questions skip retrieval and the LLM call entirely
+    cache_key = make_answer_cache_key(tenant_id, request)
+    cached_response = get_cached_answer(cache_key)
+    if cached_response is not None:
+        response_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        log_query(
+            tenant_id,
+            request,
+            answer_length=len(cached_response.answer),
+            sources_count=len(cached_response.sources),
+            response_time_ms=response_time,
+            success=True
         )
-        index = VectorStoreIndex.from_vector_store(vector_store)
+        return cached_response
 
+    try:
         # Build dynamic filters
         metadata_filters = build_metadata_filters(tenant_id, request)
         
         # Apply filters to retriever
         retriever = index.as_retriever(
-            similarity_top_k=5, 
+            similarity_top_k=RETRIEVAL_TOP_K, 
             filters=metadata_filters
         )
 
-        reranker = SentenceTransformerRerank(
-            model="cross-encoder/ms-marco-TinyBERT-L-2",
-            top_n=3
-        )
-        
-        query_engine = RetrieverQueryEngine(
+        query_engine = RetrieverQueryEngine.from_args(
             retriever=retriever,
+            llm=llm,
             node_postprocessors=[reranker],
         )
 
         response = await query_engine.aquery(request.query)
 
         # Extract sources with rich metadata
-        sources = []
-        for node in response.source_nodes:
-            # Convert score to native Python float if it exists
-            score = None
-            if hasattr(node, 'score') and node.score is not None:
-                score = float(node.score)  # Convert numpy.float32 to Python float
-            
-            source_info = {
-                "document_id": node.metadata.get("document_id", "N/A"),
-                "file_name": node.metadata.get("file_name", "N/A"),
-                "category": node.metadata.get("category", "uncategorized"),
-                "tags": node.metadata.get("tags", []),
-                "content_preview": node.text[:200] + "...",
-                "score": score
-            }
-            sources.append(source_info)
+        sources = extract_sources(response.source_nodes)
         answer = str(response)
 
         end_time = datetime.now()
         response_time = int((end_time - start_time).total_seconds() * 1000)
 
-        query_log = QueryLog(
-            tenant_id=tenant_id,
-            query_text=request.query,
-            filters_applied=get_applied_filters_summary(request),
+        log_query(
+            tenant_id,
+            request,
             answer_length=len(answer),
             sources_count=len(sources),
             response_time_ms=response_time,
             success=True
         )
-        db.add(query_log)
-        await db.commit()
 
-        return QueryResponse(
-            answer=str(response),
+        query_response = QueryResponse(
+            answer=answer,
             sources=sources,
             filters_applied=get_applied_filters_summary(request)
         )
+        set_cached_answer(cache_key, query_response)
+        return query_response
 
     except Exception as e:
 
-        end_time = datetime.utcnow()
+        end_time = datetime.now()
         response_time = int((end_time - start_time).total_seconds() * 1000)
-        query_log = QueryLog(
-            tenant_id=tenant_id,
-            query_text=request.query,
-            filters_applied=get_applied_filters_summary(request),
+        log_query(
+            tenant_id,
+            request,
             answer_length=len(answer),
             sources_count=len(sources),
             response_time_ms=response_time,
             success=False,
             error_message=str(e)
         )
-        db.add(query_log)
-        await db.commit()
 
-        print(f"Query Error for Tenant {tenant_id}: {e}")
+        logger.exception("Query failed for tenant %s", tenant_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Query processing failed: {type(e).__name__}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QueryRequest,
+    tenant_id: str = Depends(get_current_tenant_id),
+    index = Depends(get_vector_index),
+    reranker = Depends(get_reranker),
+    llm = Depends(get_llm)
+):
+    """
+    Query documents and stream the answer as server-sent events.
+    Tokens are sent as they are generated; sources follow in a final 'sources' event.
+    """
+    start_time = datetime.now()
+    filters_applied = get_applied_filters_summary(request)
+
+    try:
+        retriever = index.as_retriever(
+            similarity_top_k=RETRIEVAL_TOP_K,
+            filters=build_metadata_filters(tenant_id, request)
+        )
+        query_engine = RetrieverQueryEngine.from_args(
+            retriever=retriever,
+            llm=llm,
+            node_postprocessors=[reranker],
+            streaming=True,
+        )
+        response = await query_engine.aquery(request.query)
+        sources = extract_sources(response.source_nodes)
+    except Exception as e:
+        logger.exception("Query failed for tenant %s", tenant_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query processing failed: {type(e).__name__}"
+        )
+
+    async def event_stream():
+        answer_length = 0
+        error_message = None
+        try:
+            async for token in response.async_response_gen():
+                answer_length += len(token)
+                yield f"data: {json.dumps(token)}\n\n"
+            yield f"event: sources\ndata: {json.dumps({'sources': sources, 'filters_applied': filters_applied})}\n\n"
+        except Exception as e:
+            error_message = str(e)
+            logger.exception("Streaming failed for tenant %s", tenant_id)
+            yield f"event: error\ndata: {json.dumps({'detail': type(e).__name__})}\n\n"
+        finally:
+            # The request-scoped session isn't guaranteed to outlive the stream
+            response_time = int((datetime.now() - start_time).total_seconds() * 1000)
+            log_query(
+                tenant_id,
+                request,
+                answer_length=answer_length,
+                sources_count=len(sources),
+                response_time_ms=response_time,
+                success=error_message is None,
+                error_message=error_message
+            )
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
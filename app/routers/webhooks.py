@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 import secrets
 
-from app.database import get_db
+from app.database import get_db, transaction
 from app.core.security import get_current_tenant_id
 from app.models.document import Webhook
+from app.utils.webhooks import dispatch_webhook
 from app.schemas.webhook_schema import WebhookCreate, WebhookResponse, WebhookUpdate
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
+async def get_webhook_or_404(db: AsyncSession, webhook_id: str, tenant_id: str) -> Webhook:
+    """Primary-key lookup (served from the identity map when already loaded), scoped to the tenant"""
+    webhook = await db.get(Webhook, webhook_id)
+    
+    if not webhook or webhook.tenant_id != tenant_id:
+        raise HTTPException(status_code=404, detail="Webhook not found")
+    
+    return webhook
+
+
 @router.post("/", response_model=WebhookResponse)
 async def create_webhook(
     webhook_data: WebhookCreate,
@@ -25,8 +36,8 @@ async def create_webhook(
         secret=secrets.token_urlsafe(32)  # Generate random secret
     )
     
-    db.add(webhook)
-    await db.commit()
+    async with transaction(db):
+        db.add(webhook)
     await db.refresh(webhook)
     
     return webhook
@@ -52,16 +63,7 @@ async def get_webhook(
     db: AsyncSession = Depends(get_db)
 ):
     """Get webhook details"""
-    result = await db.execute(
-        select(Webhook).where(
-            Webhook.id == webhook_id,
-            Webhook.tenant_id == tenant_id
-        )
-    )
-    webhook = result.scalar_one_or_none()
-    
-    if not webhook:
-        raise HTTPException(status_code=404, detail="Webhook not found")
+    webhook = await get_webhook_or_404(db, webhook_id, tenant_id)
     
     return webhook
 
@@ -74,25 +76,15 @@ async def update_webhook(
     db: AsyncSession = Depends(get_db)
 ):
     """Update webhook configuration"""
-    result = await db.execute(
-        select(Webhook).where(
-            Webhook.id == webhook_id,
-            Webhook.tenant_id == tenant_id
-        )
-    )
-    webhook = result.scalar_one_or_none()
-    
-    if not webhook:
-        raise HTTPException(status_code=404, detail="Webhook not found")
-    
-    if update_data.url is not None:
-        webhook.url = str(update_data.url)
-    if update_data.events is not None:
-        webhook.events = update_data.events
-    if update_data.is_active is not None:
-        webhook.is_active = update_data.is_active
-    
-    await db.commit()
+    async with transaction(db):
+        webhook = await get_webhook_or_404(db, webhook_id, tenant_id)
+        
+        if update_data.url is not None:
+            webhook.url = str(update_data.url)
+        if update_data.events is not None:
+            webhook.events = update_data.events
+        if update_data.is_active is not None:
+            webhook.is_active = update_data.is_active
     await db.refresh(webhook)
     
     return webhook
@@ -105,49 +97,30 @@ async def delete_webhook(
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a webhook"""
-    result = await db.execute(
-        select(Webhook).where(
-            Webhook.id == webhook_id,
-            Webhook.tenant_id == tenant_id
-        )
-    )
-    webhook = result.scalar_one_or_none()
-    
-    if not webhook:
-        raise HTTPException(status_code=404, detail="Webhook not found")
-    
-    await db.delete(webhook)
-    await db.commit()
+    async with transaction(db):
+        webhook = await get_webhook_or_404(db, webhook_id, tenant_id)
+        await db.delete(webhook)
     
     return {"status": "success", "message": "Webhook deleted"}
 
 
-@router.post("/{webhook_id}/test")
+@router.post("/{webhook_id}/test", status_code=status.HTTP_202_ACCEPTED)
 async def test_webhook(
     webhook_id: str,
+    background_tasks: BackgroundTasks,
     tenant_id: str = Depends(get_current_tenant_id),
     db: AsyncSession = Depends(get_db)
 ):
-    """Send a test webhook"""
-    from app.utils.webhooks import trigger_webhook
-    
-    result = await db.execute(
-        select(Webhook).where(
-            Webhook.id == webhook_id,
-            Webhook.tenant_id == tenant_id
-        )
-    )
-    webhook = result.scalar_one_or_none()
-    
-    if not webhook:
-        raise HTTPException(status_code=404, detail="Webhook not found")
+    """Queue a test webhook (delivered after the response is sent)"""
+    # Existence/ownership check only; dispatch looks up the tenant's active webhooks itself
+    await get_webhook_or_404(db, webhook_id, tenant_id)
     
-    # Send test event
-    await trigger_webhook(
-        db=db,
+    # Send test event without waiting on the receiving endpoint
+    background_tasks.add_task(
+        dispatch_webhook,
         tenant_id=tenant_id,
         event="test.webhook",
         payload={"message": "This is a test webhook"}
     )
     
-    return {"status": "success", "message": "Test webhook sent"}
\ No newline at end of file
+    return {"status": "queued", "message": "Test webhook queued"}
@@ -22,12 +22,13 @@ class TenantResponse(BaseModel):
         from_attributes = True
 
 class TenantListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # Only filled when include_total=true
     tenants: List[TenantResponse]
+    next_cursor: Optional[str] = None
 
 class TenantStatsResponse(BaseModel):
     tenant_id: str
     tenant_name: str
-    document_count: str
+    document_count: int
     total_queries: int
     storage_used_mb: float
\ No newline at end of file
@@ -69,4 +69,6 @@ class DocumentResponse(BaseModel):
 # Response Schema: List of Documents
 # ---------------------------------------
 class DocumentListResponse(BaseModel):
+    total: Optional[int] = None
     documents: List[DocumentResponse]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,8 @@
+# Run from the repo root: python -m app.setup_db
 from qdrant_client import QdrantClient, models
 import os
+from app.utils.filters import FILTER_PAYLOAD_INDEXES  # Shared with the app's startup check
+from app.utils.qdrant_collection import SCALAR_QUANTIZATION
 
 # Configuration (Use localhost because you ran Qdrant locally via Docker)
 QDRANT_URL = "http://localhost:6333"
@@ -14,41 +17,45 @@ def create_collection_with_index():
     # 1. Define Vector Configuration (Size and Distance)
     vectors_config = models.VectorParams(
         size=VECTOR_DIMENSION, 
-        distance=models.Distance.COSINE # COSINE is standard for text embeddings
+        distance=models.Distance.COSINE, # COSINE is standard for text embeddings
+        on_disk=True # Full-precision vectors are memmapped; searches use the int8 copy in RAM
     )
 
-    # 2. Create the Collection
-    print(f"Creating collection '{COLLECTION_NAME}'...")
-    try:
-        client.recreate_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=vectors_config,
-        )
-        print(f"Collection '{COLLECTION_NAME}' created successfully.")
-    except Exception as e:
-        print(f"Error creating collection: {e}")
-        return
+    # 2. Create the Collection (idempotent: never drops existing data)
+    if client.collection_exists(COLLECTION_NAME):
+        print(f"Collection '{COLLECTION_NAME}' already exists; leaving it as is.")
+    else:
+        print(f"Creating collection '{COLLECTION_NAME}'...")
+        try:
+            client.create_collection(
+                collection_name=COLLECTION_NAME,
+                vectors_config=vectors_config,
+                # Every search is tenant-filtered: no global graph (m=0), one graph per tenant_id
+                # value instead (payload_m). Graphs stay in RAM; they're small next to the vectors
+                hnsw_config=models.HnswConfigDiff(m=0, payload_m=16, ef_construct=200, on_disk=False),
+                optimizers_config=models.OptimizersConfigDiff(
+                    memmap_threshold=20000,
+                    indexing_threshold=20000
+                ),
+                quantization_config=SCALAR_QUANTIZATION,
+            )
+            print(f"Collection '{COLLECTION_NAME}' created successfully.")
+        except Exception as e:
+            print(f"Error creating collection: {e}")
+            return
 
-    # 3. Create the CRITICAL Payload Index for Multi-Tenancy
-    # This optimizes the search speed when filtering by 'tenant_id'
-    # 3. Create the CRITICAL Payload Index for Multi-Tenancy
-    TENANT_FIELD_NAME = "tenant_id"
-    
-    print(f"Creating payload index on '{TENANT_FIELD_NAME}'...")
-    try:
-        # **CORRECTED SYNTAX:** Pass KeywordIndexParams directly to field_schema
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name=TENANT_FIELD_NAME,
-            # Use KeywordIndexParams to specify the type and the crucial is_tenant=True flag
-            field_schema=models.KeywordIndexParams(
-                type=models.PayloadSchemaType.KEYWORD,
-                is_tenant=True # This flag optimizes storage for multi-tenancy
-            ),
-        )
-        print(f"Payload index for '{TENANT_FIELD_NAME}' created successfully. Multi-Tenancy ready.")
-    except Exception as e:
-        print(f"Error creating payload index: {e}")
+    # 3. Index every field build_metadata_filters can filter on, so filtered searches don't
+    # fall back to scanning payloads. tenant_id is_tenant=True optimizes storage for multi-tenancy
+    for field_name, field_schema in FILTER_PAYLOAD_INDEXES.items():
+        try:
+            client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+            print(f"Payload index for '{field_name}' created successfully.")
+        except Exception as e:
+            print(f"Error creating payload index for '{field_name}': {e}")
         
     print("\n--- Setup Complete ---")
 
@@ -0,0 +1,31 @@
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Dynamically quantized int8 export shipped in the model repo (AVX-512 VNNI kernels)
+ONNX_MODEL_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def get_embedder():
+    """
+    Load the embedding model: FP16 PyTorch on CUDA hosts, otherwise the int8 ONNX Runtime
+    build, falling back to the FP32 PyTorch model when the ONNX backend isn't installed.
+    """
+    if _cuda_available():
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, device="cuda").half()
+    try:
+        return SentenceTransformer(
+            EMBEDDING_MODEL_NAME,
+            backend="onnx",
+            model_kwargs={"file_name": ONNX_MODEL_FILE}
+        )
+    except ImportError as e:
+        print(f"WARNING: ONNX backend unavailable ({e}); using the PyTorch model")
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
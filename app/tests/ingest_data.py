@@ -1,17 +1,30 @@
+import asyncio
+import os
 import uuid
-from qdrant_client import QdrantClient, models
-from sentence_transformers import SentenceTransformer
+import numpy as np
+import torch
+from qdrant_client import AsyncQdrantClient, models
+from embedder import EMBEDDING_MODEL_NAME, get_embedder
 from tqdm import tqdm # For visualizing progress
 
 # --- Configuration ---
 QDRANT_URL = "http://localhost:6333"
+QDRANT_GRPC_PORT = 6334  # prefer_grpc: vectors travel as packed floats, not JSON
 COLLECTION_NAME = "enterprise_knowledge"
 # CRITICAL: This is the ID for the first client's data. 
 # This must match the index you created.
 TENANT_ID = "client_alpha_2025" 
-EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 CHUNK_SIZE = 512
 CHUNK_OVERLAP = 50
+UPLOAD_BATCH_SIZE = 64
+UPLOAD_PARALLEL = 4
+# Ingests at least this large pause HNSW indexing for the duration of the upload
+BULK_INDEXING_MIN_POINTS = 10000
+ENCODE_BATCH_SIZE = 64
+
+# Intra-op parallelism across all cores for the PyTorch encode path (no-op for ONNX Runtime)
+torch.set_num_threads(os.cpu_count() or 1)
+torch.set_num_interop_threads(1)
 
 # Sample document text for Tenant Alpha
 SAMPLE_DOCUMENT = """
@@ -26,62 +39,87 @@ The primary contact for security and compliance issues is Jane Doe at security@a
 
 def split_text_into_chunks(text, chunk_size, chunk_overlap):
     """A simple character-level chunker."""
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk.strip())
-        start += chunk_size - chunk_overlap
-    return chunks
+    stride = chunk_size - chunk_overlap
+    return [text[start:start + chunk_size].strip() for start in range(0, len(text), stride)]
 
-def ingest_data():
+async def ingest_data():
     """Chunks text, embeds it, and upserts it to Qdrant with a tenant ID payload."""
     
     print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}...")
-    # 1. Initialize Embedding Model (uses the PyTorch stack you installed)
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    # 1. Initialize Embedding Model (FP16 on CUDA, int8 ONNX Runtime build on CPU)
+    embedding_model = get_embedder()
     
     # 2. Initialize Qdrant Client
-    client = QdrantClient(url=QDRANT_URL)
+    # gRPC sends vectors as packed float32 instead of JSON number text
+    client = AsyncQdrantClient(url=QDRANT_URL, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=True)
 
     # 3. Process Document
     print(f"Chunking document and tagging with Tenant ID: {TENANT_ID}")
     text_chunks = split_text_into_chunks(SAMPLE_DOCUMENT, CHUNK_SIZE, CHUNK_OVERLAP)
     
     # 4. Generate Embeddings 
-    vectors = embedding_model.encode(text_chunks, convert_to_numpy=True)
-    
-    points = []
-    for i, (vector, chunk) in enumerate(zip(vectors, text_chunks)):
-        # 5. Prepare the PointStruct
-        point = models.PointStruct(
-            id=i,  # Simple sequential ID for this example
-            vector=vector.tolist(),
-            payload={
-                "text": chunk, 
-                "tenant_id": TENANT_ID, # CRITICAL: The security tag
-                "source": "internal_memo_2025" 
-            }
+    with torch.inference_mode():
+        vectors = embedding_model.encode(
+            text_chunks,
+            batch_size=ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
         )
-        points.append(point)
+    
+    # 5. Prepare ids/vectors/payloads as parallel columns (no per-point PointStruct objects)
+    ids = list(range(len(text_chunks)))  # Simple sequential IDs for this example
+    vectors = vectors.astype(np.float32, copy=False)
+    payloads = [
+        {
+            "text": chunk, 
+            "tenant_id": TENANT_ID, # CRITICAL: The security tag
+            "source": "internal_memo_2025" 
+        }
+        for chunk in text_chunks
+    ]
 
-    # 6. Upsert Points to Qdrant (in a single batch)
-    print(f"Uploading {len(points)} points to '{COLLECTION_NAME}'...")
+    # 6. Upload Points to Qdrant (client batches the columns over parallel workers)
+    print(f"Uploading {len(ids)} points to '{COLLECTION_NAME}'...")
+    bulk = len(ids) >= BULK_INDEXING_MIN_POINTS
     try:
-        # CORRECTED LINE: Pass the 'points' list directly to client.upsert
-        # We will let Qdrant's client handle its own progress logging or simply wait.
-        operation_info = client.upsert(
+        if bulk:
+            # Build the HNSW graph once after the upload instead of incrementally during it
+            await client.update_collection(
+                collection_name=COLLECTION_NAME,
+                optimizer_config=models.OptimizersConfigDiff(indexing_threshold=0)
+            )
+        # upload_collection is a plain (blocking) method even on the async client
+        await asyncio.to_thread(
+            client.upload_collection,
+            collection_name=COLLECTION_NAME,
+            vectors=vectors,
+            payload=payloads,
+            ids=ids,
+            batch_size=UPLOAD_BATCH_SIZE,
+            parallel=UPLOAD_PARALLEL,
+            wait=True  # query_data.py runs next; return only once the points are searchable
+        )
+        stored = await client.count(
             collection_name=COLLECTION_NAME,
-            wait=True,
-            points=points # The fix is passing the list directly
+            count_filter=models.Filter(must=[
+                models.FieldCondition(key="tenant_id", match=models.MatchValue(value=TENANT_ID))
+            ]),
+            exact=True
         )
         print("\n--- Ingestion Complete ---")
-        print(f"Status: {operation_info.status.name}")
-        print(f"Points inserted/updated: {len(points)}")
+        print(f"Points inserted/updated: {len(ids)}")
+        print(f"Points stored for {TENANT_ID}: {stored.count}")
         
     except Exception as e:
         print(f"Error during upsert: {e}")
+    finally:
+        if bulk:
+            await client.update_collection(
+                collection_name=COLLECTION_NAME,
+                optimizer_config=models.OptimizersConfigDiff(indexing_threshold=20000)
+            )
+        await client.close()
 
 if __name__ == "__main__":
-    ingest_data()
\ No newline at end of file
+    asyncio.run(ingest_data())
\ No newline at end of file
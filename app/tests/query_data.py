@@ -1,10 +1,12 @@
-from qdrant_client import QdrantClient, models
-from sentence_transformers import SentenceTransformer
+import asyncio
+from functools import lru_cache
+from qdrant_client import AsyncQdrantClient, models
+from embedder import get_embedder
 
 # --- Configuration ---
 QDRANT_URL = "http://localhost:6333"
+QDRANT_GRPC_PORT = 6334  # prefer_grpc: vectors travel as packed floats, not JSON
 COLLECTION_NAME = "enterprise_knowledge"
-EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
 # CRITICAL QUERIES
 QUERY_TEXT = "Who is the primary contact for security and compliance issues?"
@@ -13,15 +15,26 @@ QUERY_TEXT = "Who is the primary contact for security and compliance issues?"
 CORRECT_TENANT_ID = "client_alpha_2025" 
 WRONG_TENANT_ID = "client_beta_2025"
 
-def query_data(tenant_id, query_text):
-    """Queries Qdrant using manual embeddings and tenant_id filter."""
-    
-    # Initialize Clients
-    client = QdrantClient(url=QDRANT_URL)
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+# Loaded once and reused by every query_data() call
+_client = AsyncQdrantClient(url=QDRANT_URL, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=True)
+
+
+@lru_cache(maxsize=1)
+def _model():
+    return get_embedder()
+
+
+async def query_data(tenant_id, query_texts: list[str]):
+    """Queries Qdrant using manual embeddings and tenant_id filter; one result list per query."""
     
-    # Generate query embedding
-    query_vector = embedding_model.encode(query_text).tolist()
+    # Generate all query embeddings in one batched encode (off the event loop: it's CPU-bound)
+    query_vectors = await asyncio.to_thread(
+        _model().encode,
+        query_texts,
+        batch_size=32,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
 
     # Define the security filter
     tenant_filter = models.Filter(
@@ -33,25 +46,31 @@ def query_data(tenant_id, query_text):
         ]
     )
 
-    # Perform the secure search using query_points (NOT query)
-    search_result = client.query_points(
+    # Perform the secure searches in a single round-trip
+    requests = [
+        models.QueryRequest(
+            query=vector.tolist(),
+            filter=tenant_filter,
+            limit=1,
+            with_payload=True
+        )
+        for vector in query_vectors
+    ]
+    search_results = await _client.query_batch_points(
         collection_name=COLLECTION_NAME,
-        query=query_vector,  # Pass the vector here
-        query_filter=tenant_filter,
-        limit=1,
-        with_payload=True
+        requests=requests
     )
     
-    return search_result.points
+    return [result.points for result in search_results]
 
-if __name__ == "__main__":
+async def main():
     print(f"--- Querying Data for RAG System ---")
 
     # TEST 1: ISOLATION TEST (USING WRONG TENANT ID)
     print("\n[TEST 1: UNSECURE SEARCH (Isolation Check)]")
     print(f"Simulating a query from WRONG TENANT: {WRONG_TENANT_ID}")
     
-    results_wrong = query_data(WRONG_TENANT_ID, QUERY_TEXT)
+    results_wrong = (await query_data(WRONG_TENANT_ID, [QUERY_TEXT]))[0]
     
     print(f"Results Found: {len(results_wrong)}")
     if not results_wrong:
@@ -66,7 +85,7 @@ if __name__ == "__main__":
     print("\n[TEST 2: SECURE SEARCH (Retrieval Check)]")
     print(f"Simulating a query from CORRECT TENANT: {CORRECT_TENANT_ID}")
     
-    results_correct = query_data(CORRECT_TENANT_ID, QUERY_TEXT)
+    results_correct = (await query_data(CORRECT_TENANT_ID, [QUERY_TEXT]))[0]
     
     print(f"Results Found: {len(results_correct)}")
     if results_correct:
@@ -76,4 +95,9 @@ if __name__ == "__main__":
             print(f"Score: {result.score:.4f}")
             print(f"Text: {result.payload['text']}")
     else:
-        print("❌ **FAILURE:** The correct tenant could not retrieve their own data!")
\ No newline at end of file
+        print("❌ **FAILURE:** The correct tenant could not retrieve their own data!")
+
+    await _client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
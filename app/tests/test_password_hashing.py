@@ -0,0 +1,29 @@
+# Password hashing round-trip (run: pytest app/tests/test_password_hashing.py; needs the app's .env)
+from passlib.context import CryptContext
+from app.core.config import settings
+from app.crud.user import hash_password, verify_password, pwd_context
+
+
+def test_hash_and_verify():
+    hashed = hash_password("correct horse battery staple")
+    
+    assert hashed.startswith("$2b$")
+    assert verify_password("correct horse battery staple", hashed)
+    assert not verify_password("wrong password", hashed)
+
+
+def test_verify_and_update_rehashes_other_cost():
+    # A hash made at a different cost factor, like those created before BCRYPT_ROUNDS changed
+    other_rounds = settings.BCRYPT_ROUNDS + 1
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=other_rounds).hash("s3cret")
+    
+    verified, new_hash = pwd_context.verify_and_update("s3cret", old_hash)
+    assert verified
+    assert new_hash is not None
+    assert pwd_context.identify(new_hash) == "bcrypt"
+    assert f"${settings.BCRYPT_ROUNDS:02d}$" in new_hash
+    
+    # Current-cost hashes verify without a rehash
+    verified, newer_hash = pwd_context.verify_and_update("s3cret", new_hash)
+    assert verified
+    assert newer_hash is None
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import threading
+from typing import Any, Hashable, Optional
+from cachetools import TTLCache
+from app.core.config import settings
+
+# Admin analytics responses keyed by (endpoint, tenant_id or None, *params)
+_analytics_cache: TTLCache = TTLCache(maxsize=1024, ttl=settings.ANALYTICS_CACHE_TTL_SECONDS)
+_analytics_lock = threading.Lock()
+
+
+def get_cached_analytics(key: tuple) -> Optional[Any]:
+    """Return a cached analytics response, or None on a miss."""
+    with _analytics_lock:
+        return _analytics_cache.get(key)
+
+
+def set_cached_analytics(key: tuple, value: Any) -> None:
+    with _analytics_lock:
+        _analytics_cache[key] = value
+
+
+def invalidate_analytics(tenant_id: Hashable, include_global: bool = True) -> None:
+    """Drop cached analytics for a tenant, plus the cross-tenant (tenant_id=None) views unless include_global=False."""
+    with _analytics_lock:
+        for key in list(_analytics_cache.keys()):
+            if key[1] == tenant_id or (include_global and key[1] is None):
+                _analytics_cache.pop(key, None)
+
+
+# /ask responses keyed by (tenant_id, sha256 of normalized query + filters).
+# Local to each worker; the short TTL bounds staleness in the workers that missed an invalidation.
+_answer_cache: TTLCache = TTLCache(maxsize=4096, ttl=settings.ASK_CACHE_TTL_SECONDS)
+_answer_lock = threading.Lock()
+
+
+def make_answer_cache_key(tenant_id: str, request) -> tuple:
+    """Normalize case/whitespace of the question; filters are part of the key."""
+    normalized_query = " ".join(request.query.lower().split())
+    filters = json.dumps(request.model_dump(exclude={"query"}), sort_keys=True)
+    digest = hashlib.sha256(f"{normalized_query}\n{filters}".encode()).hexdigest()
+    return (tenant_id, digest)
+
+
+def get_cached_answer(key: tuple) -> Optional[Any]:
+    with _answer_lock:
+        return _answer_cache.get(key)
+
+
+def set_cached_answer(key: tuple, value: Any) -> None:
+    with _answer_lock:
+        _answer_cache[key] = value
+
+
+def invalidate_answers(tenant_id: str) -> None:
+    """Drop a tenant's cached answers (call whenever its documents change)."""
+    with _answer_lock:
+        for key in list(_answer_cache.keys()):
+            if key[0] == tenant_id:
+                _answer_cache.pop(key, None)
+
+
+# Tenant upload limits (max_documents) keyed by tenant_id; short TTL bounds staleness
+_tenant_limit_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_tenant_limit_lock = threading.Lock()
+
+
+def get_cached_tenant_limit(tenant_id: str) -> Optional[int]:
+    with _tenant_limit_lock:
+        return _tenant_limit_cache.get(tenant_id)
+
+
+def set_cached_tenant_limit(tenant_id: str, max_documents: int) -> None:
+    with _tenant_limit_lock:
+        _tenant_limit_cache[tenant_id] = max_documents
+
+
+def invalidate_tenant(tenant_id: str) -> None:
+    """Forget a tenant's cached limits (call when the tenant is updated or deleted)."""
+    with _tenant_limit_lock:
+        _tenant_limit_cache.pop(tenant_id, None)
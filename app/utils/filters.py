@@ -1,22 +1,75 @@
+from functools import lru_cache
 from llama_index.core.vector_stores.types import MetadataFilters, MetadataFilter, ExactMatchFilter, FilterOperator
+from qdrant_client import AsyncQdrantClient, models
 
-def build_metadata_filters(tenant_id: str, request):
-    filters = [ExactMatchFilter(key="tenant_id", value=tenant_id)]
+# Payload index for every key the filters below can match on; without one Qdrant scans payloads
+FILTER_PAYLOAD_INDEXES = {
+    "tenant_id": models.KeywordIndexParams(type=models.PayloadSchemaType.KEYWORD, is_tenant=True),
+    "document_id": models.PayloadSchemaType.KEYWORD,
+    "category": models.PayloadSchemaType.KEYWORD,
+    "tags": models.PayloadSchemaType.KEYWORD,
+    "file_type": models.PayloadSchemaType.KEYWORD,
+    "upload_date": models.PayloadSchemaType.DATETIME,
+}
+
+async def ensure_payload_indexes(client: AsyncQdrantClient, collection_name: str):
+    """Create any missing filter payload indexes. No-op until the collection exists (first upload creates it)."""
+    if not await client.collection_exists(collection_name):
+        return
+    existing = (await client.get_collection(collection_name)).payload_schema
+    for field_name, field_schema in FILTER_PAYLOAD_INDEXES.items():
+        if field_name not in existing:
+            await client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=False
+            )
+
+@lru_cache(maxsize=10_000)
+def tenant_metadata_filters(tenant_id: str) -> MetadataFilters:
+    """Tenant-only filter, built once per tenant. Treat as read-only: it is shared across requests."""
+    return MetadataFilters(filters=[ExactMatchFilter(key="tenant_id", value=tenant_id)])
+
+def _as_key(values):
+    """Order-insensitive, hashable form of a list filter (None when unset or empty)."""
+    return tuple(sorted(values)) if values else None
+
+@lru_cache(maxsize=1024)
+def _build_metadata_filters(tenant_id, document_ids, categories, tags, file_types, date_from, date_to) -> MetadataFilters:
+    tenant_filters = tenant_metadata_filters(tenant_id)
+    filters = []
     
-    if request.document_ids:
-        filters.append(MetadataFilter(key="document_id", value=request.document_ids, operator=FilterOperator.IN))
-    if request.categories:
-        filters.append(MetadataFilter(key="category", value=request.categories, operator=FilterOperator.IN))
-    if request.tags:
-        filters.append(MetadataFilter(key="tags", value=request.tags, operator=FilterOperator.IN))
-    if request.file_types:
-        filters.append(MetadataFilter(key="file_type", value=request.file_types, operator=FilterOperator.IN))
-    if request.date_from:
-        filters.append(MetadataFilter(key="upload_date", value=request.date_from, operator=FilterOperator.GTE))
-    if request.date_to:
-        filters.append(MetadataFilter(key="upload_date", value=request.date_to, operator=FilterOperator.LTE))
+    if document_ids:
+        filters.append(MetadataFilter(key="document_id", value=list(document_ids), operator=FilterOperator.IN))
+    if categories:
+        filters.append(MetadataFilter(key="category", value=list(categories), operator=FilterOperator.IN))
+    if tags:
+        filters.append(MetadataFilter(key="tags", value=list(tags), operator=FilterOperator.IN))
+    if file_types:
+        filters.append(MetadataFilter(key="file_type", value=list(file_types), operator=FilterOperator.IN))
+    if date_from:
+        filters.append(MetadataFilter(key="upload_date", value=date_from, operator=FilterOperator.GTE))
+    if date_to:
+        filters.append(MetadataFilter(key="upload_date", value=date_to, operator=FilterOperator.LTE))
     
-    return MetadataFilters(filters=filters)
+    # Most queries are unfiltered: reuse the cached tenant-only object
+    if not filters:
+        return tenant_filters
+    # tenant_id first: it selects the tenant's own HNSW graph
+    return MetadataFilters(filters=[*tenant_filters.filters, *filters])
+
+def build_metadata_filters(tenant_id: str, request) -> MetadataFilters:
+    """Filters for a query request; repeated filter combinations share one cached (read-only) object."""
+    return _build_metadata_filters(
+        tenant_id,
+        _as_key(request.document_ids),
+        _as_key(request.categories),
+        _as_key(request.tags),
+        _as_key(request.file_types),
+        request.date_from or None,
+        request.date_to or None,
+    )
 
 def get_applied_filters_summary(request):
     summary = {}
@@ -0,0 +1,66 @@
+import asyncio
+from typing import List, Optional
+from app.database import AsyncSessionLocal
+from app.core.logging_config import logger
+from app.models.document import QueryLog
+from app.utils.cache import invalidate_analytics
+
+# Rows per INSERT batch; whatever has queued up while the previous batch was written
+BATCH_SIZE = 500
+
+_queue: "asyncio.Queue[Optional[QueryLog]]" = asyncio.Queue()
+_writer_task: Optional[asyncio.Task] = None
+
+
+def enqueue_query_log(query_log: QueryLog) -> None:
+    """Queue a QueryLog for the background writer (no DB round trip on the request path)."""
+    _queue.put_nowait(query_log)
+
+
+async def _write_batch(batch: List[QueryLog]):
+    try:
+        async with AsyncSessionLocal() as db:
+            # One flush: SQLAlchemy sends the rows as a multi-row INSERT ... RETURNING
+            db.add_all(batch)
+            await db.commit()
+    except Exception:
+        logger.exception("Query log write failed, dropped %d rows", len(batch))
+        return
+    
+    # Only the tenants in this batch; the cross-tenant views are left to their TTL,
+    # otherwise every flush under steady traffic would empty them
+    for tenant_id in {query_log.tenant_id for query_log in batch}:
+        invalidate_analytics(tenant_id, include_global=False)
+
+
+async def _run():
+    while True:
+        item = await _queue.get()
+        # None is the shutdown sentinel
+        stop = item is None
+        batch = [] if stop else [item]
+        while not stop and len(batch) < BATCH_SIZE and not _queue.empty():
+            item = _queue.get_nowait()
+            if item is None:
+                stop = True
+            else:
+                batch.append(item)
+        
+        if batch:
+            await _write_batch(batch)
+        if stop:
+            return
+
+
+def start_query_log_writer():
+    global _writer_task
+    _writer_task = asyncio.create_task(_run())
+
+
+async def stop_query_log_writer():
+    """Flush everything queued so far, then stop the writer."""
+    global _writer_task
+    if _writer_task is not None:
+        _queue.put_nowait(None)
+        await _writer_task
+        _writer_task = None
@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import anyio.to_thread
+from charset_normalizer import from_bytes
+from fastapi import HTTPException
+from app.core.config import settings
+
+# Parser libraries are imported once here; missing ones only disable their file type
+try:
+    import fitz  # PyMuPDF, ~10x faster than pypdf
+except ImportError:
+    fitz = None
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+try:
+    from docx import Document as DocxDocument
+except ImportError:
+    DocxDocument = None
+
+# PDFs longer than this are split into page ranges and parsed across processes
+PARALLEL_PDF_MIN_PAGES = 32
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _page_text(page) -> str:
+    """
+    Plain-text extraction for one PyMuPDF page.
+    "text" mode builds no layout dict and collects no images or vector paths, so
+    figure-heavy pages cost little more than their text. We lose coordinates and
+    block structure, which embedding doesn't need.
+    """
+    return page.get_text("text")
+
+
+def _parse_pdf(file_path: str) -> str:
+    if fitz is not None:
+        with fitz.open(file_path, filetype="pdf") as pdf:
+            file_text = "\n".join(_page_text(page) for page in pdf)
+    elif PdfReader is not None:
+        pdf_reader = PdfReader(file_path)
+        file_text = "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
+    else:
+        raise HTTPException(status_code=500, detail="PDF support not installed. Run: pip install pymupdf")
+    if not file_text.strip():
+        raise ValueError("PDF appears to be empty or unreadable")
+    return file_text
+
+
+def _parse_docx(file_path: str) -> str:
+    if DocxDocument is None:
+        raise HTTPException(status_code=500, detail="DOCX support not installed. Run: pip install python-docx")
+    docx = DocxDocument(file_path)
+    file_text = "\n".join([para.text for para in docx.paragraphs if para.text.strip()])
+    if not file_text.strip():
+        raise ValueError("DOCX appears to be empty")
+    return file_text
+
+
+def _parse_txt(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    try:
+        # Fast path: the vast majority of uploads are UTF-8
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        # Otherwise detect the encoding instead of assuming Latin-1 (which never fails)
+        match = from_bytes(content).best()
+        if match is None:
+            raise HTTPException(status_code=400, detail="Unable to detect the text file's encoding. Please upload it as UTF-8.")
+        return str(match)
+
+
+_PARSERS = {
+    "pdf": _parse_pdf,
+    "docx": _parse_docx,
+    "doc": _parse_docx,
+    "txt": _parse_txt,
+}
+
+SUPPORTED_FILE_TYPES = tuple(_PARSERS)
+
+
+def extract_text_sync(file_path: str, file_extension: str) -> str:
+    """Decode an uploaded PDF/DOCX/TXT file on disk to plain text (synchronous)."""
+    parser = _PARSERS.get(file_extension)
+    if parser is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: .{file_extension}. Supported types: pdf, docx, txt")
+    return parser(file_path)
+
+
+def _pdf_page_count(file_path: str) -> int:
+    """Page count via PyMuPDF, or 0 when it isn't installed (no parallel path)."""
+    if fitz is None:
+        return 0
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def _extract_pdf_range(file_path: str, start: int, end: int) -> str:
+    # Each worker opens the file itself; only the path crosses the process boundary
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return "\n".join(_page_text(pdf[i]) for i in range(start, end))
+
+
+def _pdf_workers() -> int:
+    return max(1, min(settings.PDF_WORKERS, os.cpu_count() or 1))
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # forkserver: forking this process would copy live gRPC channels and torch/ONNX thread pools
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=_pdf_workers(),
+            mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+async def _extract_pdf_parallel(file_path: str, page_count: int) -> str:
+    workers = _pdf_workers()
+    step = -(-page_count // workers)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, _extract_pdf_range, file_path, start, end)
+        for start, end in ranges
+    ])
+    return "\n".join(parts)
+
+
+async def extract_text(file_path: str, file_extension: str) -> str:
+    """Decode an uploaded file without blocking the event loop."""
+    if file_extension == 'pdf':
+        page_count = await anyio.to_thread.run_sync(_pdf_page_count, file_path)
+        if page_count > PARALLEL_PDF_MIN_PAGES:
+            file_text = await _extract_pdf_parallel(file_path, page_count)
+            if not file_text.strip():
+                raise ValueError("PDF appears to be empty or unreadable")
+            return file_text
+    
+    # Small files: one worker thread (process start-up would cost more than it saves)
+    return await anyio.to_thread.run_sync(extract_text_sync, file_path, file_extension)
@@ -1,13 +1,53 @@
+import asyncio
 import httpx
 import hmac
 import hashlib
-import json
-from typing import Dict, Any
+import orjson
+from typing import Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.models.document import Webhook
+from app.database import AsyncSessionLocal
+from app.core.logging_config import logger
 from datetime import datetime
 
+# Shared client: keep-alive (and HTTP/2 where supported) connections to webhook endpoints
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _deliver(webhook: Webhook, body: bytes, event: str) -> httpx.Response:
+    """Sign and POST one webhook delivery of an already-serialized payload."""
+    signature = hmac.new(webhook.secret.encode(), body, hashlib.sha256).hexdigest()
+    
+    return await get_http_client().post(
+        webhook.url,
+        content=body,
+        headers={
+            "X-Webhook-Signature": signature,
+            "X-Webhook-Event": event,
+            "Content-Type": "application/json"
+        }
+    )
+
+
 async def trigger_webhook(
     db: AsyncSession,
     tenant_id: str,
@@ -16,58 +56,68 @@ async def trigger_webhook(
 ):
     """Trigger webhooks for a specific event"""
     
-    # Find active webhooks for this tenant and event
+    # Find active webhooks for this tenant subscribed to this event
     result = await db.execute(
         select(Webhook).where(
             Webhook.tenant_id == tenant_id,
-            Webhook.is_active == True
+            Webhook.is_active == True,
+            Webhook.events.contains([event])
         )
     )
     webhooks = result.scalars().all()
+    if not webhooks:
+        return
     
-    for webhook in webhooks:
-        # Check if webhook is subscribed to this event
-        if event not in webhook.events:
+    # Prepare payload
+    webhook_payload = {
+        "event": event,
+        "tenant_id": tenant_id,
+        "timestamp": datetime.utcnow().isoformat(),
+        "data": payload
+    }
+    # Serialized once; only the HMAC differs per subscriber, and it signs exactly the bytes sent
+    body = orjson.dumps(webhook_payload)
+    
+    # Send to every subscriber at once; one slow endpoint doesn't hold up the others
+    responses = await asyncio.gather(
+        *(_deliver(webhook, body, event) for webhook in webhooks),
+        return_exceptions=True
+    )
+    
+    # Update stats: one UPDATE per outcome instead of one per webhook
+    delivered_ids, failed_ids = [], []
+    for webhook, response in zip(webhooks, responses):
+        if isinstance(response, Exception):
+            failed_ids.append(webhook.id)
+            logger.warning("Webhook error: %s - %s", webhook.url, response)
             continue
         
-        # Prepare payload
-        webhook_payload = {
-            "event": event,
-            "tenant_id": tenant_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "data": payload
-        }
-        
-        # Generate signature
-        signature = hmac.new(
-            webhook.secret.encode(),
-            json.dumps(webhook_payload).encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Send webhook (async, don't block)
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    webhook.url,
-                    json=webhook_payload,
-                    headers={
-                        "X-Webhook-Signature": signature,
-                        "X-Webhook-Event": event,
-                        "Content-Type": "application/json"
-                    }
-                )
-                
-                # Update stats
-                webhook.total_deliveries += 1
-                webhook.last_triggered_at = datetime.utcnow()
-                
-                if response.status_code >= 400:
-                    webhook.failed_deliveries += 1
-                    print(f"Webhook failed: {webhook.url} - Status {response.status_code}")
-                
-        except Exception as e:
-            webhook.failed_deliveries += 1
-            print(f"Webhook error: {webhook.url} - {str(e)}")
+        delivered_ids.append(webhook.id)
+        if response.status_code >= 400:
+            failed_ids.append(webhook.id)
+            logger.warning("Webhook failed: %s - status %s", webhook.url, response.status_code)
     
-    await db.commit()
\ No newline at end of file
+    if delivered_ids:
+        await db.execute(
+            update(Webhook)
+            .where(Webhook.id.in_(delivered_ids))
+            .values(total_deliveries=Webhook.total_deliveries + 1, last_triggered_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    if failed_ids:
+        await db.execute(
+            update(Webhook)
+            .where(Webhook.id.in_(failed_ids))
+            .values(failed_deliveries=Webhook.failed_deliveries + 1)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+
+async def dispatch_webhook(tenant_id: str, event: str, payload: Dict[str, Any]):
+    """Trigger webhooks with a dedicated session, for use as a background task after the response is sent."""
+    async with AsyncSessionLocal() as db:
+        try:
+            await trigger_webhook(db=db, tenant_id=tenant_id, event=event, payload=payload)
+        except Exception:
+            logger.exception("Webhook dispatch failed for tenant %s", tenant_id)
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+import jwt
 from app.core.config import settings
+from app.core.security import jwt_key
 
 # 1. Define your test tenant
 TEST_TENANT_ID = "tenant_alpha_123"
@@ -12,7 +13,7 @@ payload = {
 }
 
 # 3. Sign the token using your project's SECRET_KEY
-token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+token = jwt.encode(payload, jwt_key(), algorithm=settings.ALGORITHM)
 
 print("\n--- YOUR TEST JWT TOKEN ---")
 print(token)